@@ -2,6 +2,29 @@ from typing import Dict, Any
 from agents.base_agent import BaseAgent
 from memory import RedisMemory
 
+# Constant parts of agent results, shared across calls instead of rebuilt.
+# Tuples serialize to JSON arrays exactly like the lists they replace.
+_RESEARCH_FINDINGS = (
+    "Finding 1: Data-driven insights",
+    "Finding 2: Best practices identified",
+    "Finding 3: Relevant patterns discovered"
+)
+_GENERATED_FILES = ("main.py", "utils.py")
+_PLAN_DEPENDENCIES = ("Research -> Development", "Development -> Testing")
+_VALIDATION_ISSUES = ("Minor bug in error handling", "Missing edge case test")
+_DESIGN_PALETTE = ("#1976D2", "#424242", "#F5F5F5")
+_DESIGN_COMPONENTS = ("Navigation", "Dashboard", "Forms", "Cards")
+_ANALYSIS_TRENDS = ("Upward trend in performance", "Stable efficiency")
+_ANALYSIS_RECOMMENDATIONS = (
+    "Optimize database queries",
+    "Implement caching layer",
+    "Enhance error handling"
+)
+_SECURITY_RECOMMENDATIONS = (
+    "Use parameterized queries",
+    "Upgrade encryption algorithm to AES-256"
+)
+
 
 class ResearcherAgent(BaseAgent):
     """Agent responsible for gathering and analyzing data."""
@@ -17,11 +40,7 @@ class ResearcherAgent(BaseAgent):
         research_data = {
             "query": query,
             "sources_analyzed": 10,
-            "key_findings": [
-                "Finding 1: Data-driven insights",
-                "Finding 2: Best practices identified",
-                "Finding 3: Relevant patterns discovered"
-            ],
+            "key_findings": _RESEARCH_FINDINGS,
             "summary": f"Research completed for: {query}",
             "confidence": 0.85
         }
@@ -35,6 +54,9 @@ class ResearcherAgent(BaseAgent):
 class CoderAgent(BaseAgent):
     """Agent responsible for writing and generating code."""
     
+    # Output depends on shared context, not just the task text
+    cacheable = False
+    
     def __init__(self, memory: RedisMemory):
         super().__init__("Coder", memory)
     
@@ -49,7 +71,7 @@ class CoderAgent(BaseAgent):
             "requirements": requirements,
             "code": "# Generated code\ndef example_function():\n    return 'Hello, World!'",
             "language": "python",
-            "files_generated": ["main.py", "utils.py"],
+            "files_generated": _GENERATED_FILES,
             "lines_of_code": 150,
             "used_research": research is not None
         }
@@ -78,7 +100,7 @@ class PlannerAgent(BaseAgent):
                 {"phase": "Deployment", "duration": "1 day", "status": "pending"}
             ],
             "total_duration": "10 days",
-            "dependencies": ["Research -> Development", "Development -> Testing"]
+            "dependencies": _PLAN_DEPENDENCIES
         }
         
         self.set_context("project_plan", plan)
@@ -89,6 +111,9 @@ class PlannerAgent(BaseAgent):
 class ValidatorAgent(BaseAgent):
     """Agent responsible for testing and validating output."""
     
+    # Output depends on shared context, not just the task text
+    cacheable = False
+    
     def __init__(self, memory: RedisMemory):
         super().__init__("Validator", memory)
     
@@ -106,7 +131,7 @@ class ValidatorAgent(BaseAgent):
             "tests_failed": 2,
             "code_coverage": 0.92,
             "quality_score": 0.88,
-            "issues_found": ["Minor bug in error handling", "Missing edge case test"],
+            "issues_found": _VALIDATION_ISSUES,
             "validated_code": code is not None
         }
         
@@ -128,8 +153,8 @@ class DesignerAgent(BaseAgent):
         design = {
             "requirements": requirements,
             "design_system": "Material Design 3",
-            "color_palette": ["#1976D2", "#424242", "#F5F5F5"],
-            "components": ["Navigation", "Dashboard", "Forms", "Cards"],
+            "color_palette": _DESIGN_PALETTE,
+            "components": _DESIGN_COMPONENTS,
             "wireframes": 8,
             "mockups": 5,
             "accessibility_score": 0.95
@@ -158,12 +183,8 @@ class AnalystAgent(BaseAgent):
                 "efficiency": 0.91,
                 "user_satisfaction": 0.84
             },
-            "trends": ["Upward trend in performance", "Stable efficiency"],
-            "recommendations": [
-                "Optimize database queries",
-                "Implement caching layer",
-                "Enhance error handling"
-            ]
+            "trends": _ANALYSIS_TRENDS,
+            "recommendations": _ANALYSIS_RECOMMENDATIONS
         }
         
         self.set_context("analytics_report", analysis)
@@ -174,6 +195,9 @@ class AnalystAgent(BaseAgent):
 class SecurityAgent(BaseAgent):
     """Agent responsible for security audits and risk assessment."""
     
+    # Output depends on shared context, not just the task text
+    cacheable = False
+    
     def __init__(self, memory: RedisMemory):
         super().__init__("Security", memory)
     
@@ -193,10 +217,7 @@ class SecurityAgent(BaseAgent):
                 {"type": "Weak Encryption", "severity": "medium", "file": "auth.py"}
             ],
             "compliance_score": 0.82,
-            "recommendations": [
-                "Use parameterized queries",
-                "Upgrade encryption algorithm to AES-256"
-            ],
+            "recommendations": _SECURITY_RECOMMENDATIONS,
             "audited_code": code is not None
         }
         
@@ -208,6 +229,9 @@ class SecurityAgent(BaseAgent):
 class DeployerAgent(BaseAgent):
     """Agent responsible for managing CI/CD pipelines."""
     
+    # Output depends on shared context, not just the task text
+    cacheable = False
+    
     def __init__(self, memory: RedisMemory):
         super().__init__("Deployer", memory)
     
@@ -239,6 +263,9 @@ class DeployerAgent(BaseAgent):
 class MonitorAgent(BaseAgent):
     """Agent responsible for tracking system performance."""
     
+    # Output depends on shared context, not just the task text
+    cacheable = False
+    
     def __init__(self, memory: RedisMemory):
         super().__init__("Monitor", memory)
     
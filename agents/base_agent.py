@@ -1,17 +1,62 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+import contextvars
+import hashlib
+import random
 import time
 import logging
-from memory import RedisMemory
+from memory import RedisMemory, register_constant
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# How long a memoized execute() result is reused, in seconds
+RESULT_CACHE_TTL = 3600
+
+# Upper bound of the random delay added to each retry backoff, in seconds
+RETRY_JITTER = 0.1
+
+# Task statuses written for every task, pre-encoded once
+STATUS_PROCESSING = register_constant("processing")
+STATUS_COMPLETED = register_constant("completed")
+STATUS_FAILED = register_constant("failed")
+
+# Channel on which the Redis key of each updated context entry is published
+CONTEXT_CHANNEL = "context-updates"
+
+# Context shared by the steps of an in-process workflow run (see
+# agents.workflow); None when agents talk to Redis directly.
+workflow_context = contextvars.ContextVar("workflow_context", default=None)
+
+# Context entries written by the execute() call being memoized, replayed on
+# cache hits; None outside process_task.
+context_writes = contextvars.ContextVar("context_writes", default=None)
+
+# Last (monotonic_ns, isoformat) pair handed out by _iso_now
+_LAST_TS = (0, "")
+
+
+def _iso_now() -> str:
+    """Return the current local time in ISO format, reformatted at most once per millisecond."""
+    global _LAST_TS
+    now = time.monotonic_ns()
+    last, formatted = _LAST_TS
+    if now - last < 1_000_000:
+        return formatted
+    formatted = datetime.now().isoformat()
+    _LAST_TS = (now, formatted)
+    return formatted
+
+
 class BaseAgent(ABC):
     """Base class for all agents with retry logic and error handling."""
     
+    # Whether execute() output depends only on the task text. Cache hits skip
+    # execute() and replay the context entries it wrote instead.
+    cacheable = True
+    
     def __init__(self, name: str, memory: RedisMemory):
         self.name = name
         self.memory = memory
@@ -25,7 +70,13 @@ class BaseAgent(ABC):
         pass
     
     def _retry_wrapper(self, func, *args, **kwargs):
-        """Wrapper to add retry logic to any function."""
+        """Wrapper to add retry logic to any function.
+        
+        Backs off exponentially with jitter so agents retrying the same
+        failing dependency don't hit it in lockstep. process_task runs in a
+        worker thread (see main.py), so sleeping here never blocks the
+        event loop.
+        """
         last_error = None
         for attempt in range(self.max_retries):
             try:
@@ -36,30 +87,72 @@ class BaseAgent(ABC):
                     f"{self.name}: Attempt {attempt + 1}/{self.max_retries} failed: {str(e)}"
                 )
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
+                    time.sleep(self.retry_delay * 2 ** attempt + random.uniform(0, RETRY_JITTER))
         
         raise last_error
     
+    def _cache_key(self, task: Dict[str, Any]) -> str:
+        """Build the memoization key for a task."""
+        digest = hashlib.blake2b(task.get("task", "").encode(), digest_size=16).hexdigest()
+        return f"cache:{self.name}:{digest}"
+    
     def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a task with error handling and context management."""
+        """Process a task with error handling and context management.
+        
+        Results are memoized per agent and task text, together with the
+        context entries execute() wrote, unless the agent is not cacheable or
+        the task metadata sets ``no_cache``.
+        """
         task_id = task.get("task_id", f"{self.name}_{int(time.time())}")
+        metadata = task.get("metadata") or {}
+        use_cache = self.cacheable and not metadata.get("no_cache")
+        prefix = f"task:{task_id}:"
         
         try:
+            if use_cache:
+                cache_key = self._cache_key(task)
+                cached = self.memory.get(cache_key)
+                if cached is not None:
+                    result, context = cached
+                    logger.info(f"{self.name}: Task {task_id} served from cache")
+                    for key, value in context.items():
+                        self.set_context(key, value)
+                    self.memory.pipeline_set({
+                        prefix + "agent": self.name,
+                        prefix + "result": result,
+                        prefix + "status": STATUS_COMPLETED,
+                        prefix + "completed_at": _iso_now()
+                    })
+                    return {
+                        "status": "success",
+                        "task_id": task_id,
+                        "agent": self.name,
+                        "result": result
+                    }
+            
             self.status = "processing"
             logger.info(f"{self.name}: Processing task {task_id}")
             
-            # Store task in memory
-            self.memory.set(f"task:{task_id}:status", "processing")
-            self.memory.set(f"task:{task_id}:agent", self.name)
-            self.memory.set(f"task:{task_id}:started_at", datetime.now().isoformat())
+            # Store task in memory (bookkeeping only, so don't wait on Redis)
+            self.memory.set_async(prefix + "status", STATUS_PROCESSING)
+            self.memory.set_async(prefix + "agent", self.name)
+            self.memory.set_async(prefix + "started_at", _iso_now())
             
-            # Execute with retry logic
-            result = self._retry_wrapper(self.execute, task)
+            # Execute with retry logic, recording the context it writes
+            context = {}
+            token = context_writes.set(context)
+            try:
+                result = self._retry_wrapper(self.execute, task)
+            finally:
+                context_writes.reset(token)
             
-            # Store result
-            self.memory.set(f"task:{task_id}:status", "completed")
-            self.memory.set(f"task:{task_id}:result", result)
-            self.memory.set(f"task:{task_id}:completed_at", datetime.now().isoformat())
+            if use_cache:
+                self.memory.set(cache_key, [result, context], ttl=RESULT_CACHE_TTL)
+            self._finish(prefix, {
+                prefix + "result": result,
+                prefix + "status": STATUS_COMPLETED,
+                prefix + "completed_at": _iso_now()
+            })
             
             self.status = "idle"
             logger.info(f"{self.name}: Task {task_id} completed successfully")
@@ -77,9 +170,11 @@ class BaseAgent(ABC):
             logger.error(f"{self.name}: Task {task_id} failed: {error_msg}")
             
             # Store error
-            self.memory.set(f"task:{task_id}:status", "failed")
-            self.memory.set(f"task:{task_id}:error", error_msg)
-            self.memory.set(f"task:{task_id}:failed_at", datetime.now().isoformat())
+            self._finish(prefix, {
+                prefix + "error": error_msg,
+                prefix + "status": STATUS_FAILED,
+                prefix + "failed_at": _iso_now()
+            })
             
             return {
                 "status": "error",
@@ -88,18 +183,50 @@ class BaseAgent(ABC):
                 "error": error_msg
             }
     
+    def _finish(self, prefix: str, writes: Dict[str, Any]) -> None:
+        """Write a task's final fields in one round trip before reporting it done.
+        
+        The queued "processing" bookkeeping is flushed first so it can never
+        land after, and overwrite, the final status.
+        """
+        self.memory.flush()
+        self.memory.pipeline_set(writes)
+    
     def get_status(self) -> Dict[str, str]:
         """Get current agent status."""
         return {
             "agent": self.name,
             "status": self.status,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _iso_now()
         }
     
     def get_context(self, key: str) -> Optional[Any]:
-        """Retrieve shared context from memory."""
+        """Retrieve shared context from the current workflow or memory."""
+        local = workflow_context.get()
+        if local is not None and key in local:
+            return local[key]
         return self.memory.get(f"context:{key}")
     
+    def get_contexts(self, keys: List[str]) -> Dict[str, Optional[Any]]:
+        """Retrieve several shared context entries with a single Redis MGET."""
+        local = workflow_context.get() or {}
+        missing = [key for key in keys if key not in local]
+        values = {key: local[key] for key in keys if key in local}
+        if missing:
+            stored = self.memory.mget([f"context:{key}" for key in missing])
+            values.update((key, stored[f"context:{key}"]) for key in missing)
+        return {key: values[key] for key in keys}
+    
     def set_context(self, key: str, value: Any) -> bool:
-        """Store shared context in memory."""
-        return self.memory.set(f"context:{key}", value)
+        """Store shared context in the current workflow or memory."""
+        local = workflow_context.get()
+        if local is not None:
+            local[key] = value
+            return True
+        writes = context_writes.get()
+        if writes is not None:
+            writes[key] = value
+        redis_key = f"context:{key}"
+        with self.memory.pipeline() as pipe:
+            success, _ = pipe.set(redis_key, value).publish(CONTEXT_CHANNEL, redis_key).execute()
+        return bool(success)
@@ -0,0 +1,69 @@
+import time
+import logging
+from typing import Any, Dict, List, Tuple
+from agents.base_agent import (
+    BaseAgent, CONTEXT_CHANNEL, STATUS_COMPLETED, STATUS_FAILED, workflow_context, _iso_now
+)
+from memory import RedisMemory
+
+logger = logging.getLogger(__name__)
+
+
+def run_workflow(steps: List[Tuple[BaseAgent, Dict[str, Any]]], memory: RedisMemory) -> List[Dict[str, Any]]:
+    """Run agent tasks in order within one process.
+    
+    Steps hand context to each other through an in-memory dict instead of
+    Redis; the context and all task metadata are persisted in a single
+    pipeline once the last step has run.
+    """
+    context = {}
+    writes = {}
+    results = []
+    token = workflow_context.set(context)
+    try:
+        for agent, task in steps:
+            task_id = task.get("task_id") or f"{agent.name}_{int(time.time())}"
+            prefix = f"task:{task_id}:"
+            writes[prefix + "agent"] = agent.name
+            writes[prefix + "started_at"] = _iso_now()
+            
+            try:
+                agent.status = "processing"
+                result = agent._retry_wrapper(agent.execute, task)
+                agent.status = "idle"
+            except Exception as e:
+                agent.status = "error"
+                error_msg = str(e)
+                logger.error(f"{agent.name}: Workflow task {task_id} failed: {error_msg}")
+                writes[prefix + "status"] = STATUS_FAILED
+                writes[prefix + "error"] = error_msg
+                writes[prefix + "failed_at"] = _iso_now()
+                results.append({
+                    "status": "error",
+                    "task_id": task_id,
+                    "agent": agent.name,
+                    "error": error_msg
+                })
+                continue
+            
+            writes[prefix + "status"] = STATUS_COMPLETED
+            writes[prefix + "result"] = result
+            writes[prefix + "completed_at"] = _iso_now()
+            results.append({
+                "status": "success",
+                "task_id": task_id,
+                "agent": agent.name,
+                "result": result
+            })
+    finally:
+        workflow_context.reset(token)
+    
+    with memory.pipeline() as pipe:
+        for key, value in writes.items():
+            pipe.set(key, value)
+        for key, value in context.items():
+            pipe.set(f"context:{key}", value)
+            pipe.publish(CONTEXT_CHANNEL, f"context:{key}")
+        pipe.execute()
+    
+    return results
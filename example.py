@@ -8,51 +8,67 @@ Or with Docker:
     docker-compose up -d
 """
 
-import requests
+import asyncio
 import json
-import time
+import sys
+
+import httpx
 
 BASE_URL = "http://localhost:8000"
 DEFAULT_TIMEOUT = 30  # Default timeout for API calls in seconds
 
 
 def print_response(title, response):
-    """Pretty print API response."""
+    """Print an API response, pretty-printed only for an interactive terminal."""
     print(f"\n{'=' * 60}")
     print(f"{title}")
     print(f"{'=' * 60}")
-    print(json.dumps(response.json(), indent=2))
+    if sys.stdout.isatty():
+        print(json.dumps(response.json(), indent=2))
+    else:
+        print(response.text)
 
 
-def execute_agent_task(agent_name, task, task_id, step_num, description):
+async def execute_agent_task(client, agent_name, task, task_id, step_num, description):
     """Execute a task on a specific agent."""
-    response = requests.post(
-        f"{BASE_URL}/agents/{agent_name}/execute",
-        json={"task": task, "task_id": task_id},
-        timeout=DEFAULT_TIMEOUT
+    response = await client.post(
+        f"/agents/{agent_name}/execute",
+        json={"task": task, "task_id": task_id}
     )
     print_response(f"{step_num}. {description}", response)
     return response
 
 
-def get_system_info():
+async def execute_concurrently(client, steps):
+    """Execute independent agent tasks concurrently, printing in step order."""
+    responses = await asyncio.gather(*(
+        client.post(f"/agents/{agent_name}/execute", json={"task": task, "task_id": task_id})
+        for agent_name, task, task_id, _, _ in steps
+    ))
+    for (_, _, _, step_num, description), response in zip(steps, responses):
+        print_response(f"{step_num}. {description}", response)
+    return responses
+
+
+async def get_system_info(client):
     """Perform initial system checks."""
     print("Multi-Agent AI System - Example Usage")
     print("=" * 60)
     
-    # Health check
-    response = requests.get(f"{BASE_URL}/", timeout=5)
-    print_response("1. Health Check", response)
-    
-    # List all agents
-    response = requests.get(f"{BASE_URL}/agents", timeout=10)
-    print_response("2. List All Agents", response)
+    # Health check and agent list
+    health, agents = await asyncio.gather(
+        client.get("/", timeout=5),
+        client.get("/agents", timeout=10)
+    )
+    print_response("1. Health Check", health)
+    print_response("2. List All Agents", agents)
 
 
-def run_research_workflow():
+async def run_research_workflow(client):
     """Execute research and coding workflow."""
     # Research task
-    execute_agent_task(
+    await execute_agent_task(
+        client,
         "researcher",
         "Research best practices for microservices architecture",
         "research_001",
@@ -60,13 +76,13 @@ def run_research_workflow():
         "Researcher Agent - Execute Research"
     )
     
-    # Get research context
-    time.sleep(0.5)
-    response = requests.get(f"{BASE_URL}/context/latest_research", timeout=5)
+    # Get research context (returns as soon as it has been stored)
+    response = await client.get("/context/latest_research/wait", params={"timeout": 2}, timeout=5)
     print_response("4. Get Research Context", response)
     
-    # Coding task
-    execute_agent_task(
+    # Coding task (uses the research context)
+    await execute_agent_task(
+        client,
         "coder",
         "Create a microservice skeleton in Python",
         "code_001",
@@ -75,61 +91,34 @@ def run_research_workflow():
     )
 
 
-def run_planning_workflow():
-    """Execute planning and validation workflow."""
-    # Planning task
-    execute_agent_task(
-        "planner",
-        "Plan microservice deployment",
-        "plan_001",
-        6,
-        "Planner Agent - Create Project Plan"
-    )
-    
-    # Validation task
-    execute_agent_task(
-        "validator",
-        "Validate generated code",
-        "validate_001",
-        7,
-        "Validator Agent - Test Code"
-    )
+async def run_planning_workflow(client):
+    """Execute planning and validation tasks."""
+    # Planning is independent; validation only needs the code from step 5
+    await execute_concurrently(client, [
+        ("planner", "Plan microservice deployment", "plan_001",
+         6, "Planner Agent - Create Project Plan"),
+        ("validator", "Validate generated code", "validate_001",
+         7, "Validator Agent - Test Code"),
+    ])
 
 
-def run_design_and_analysis():
-    """Execute design and analysis tasks."""
-    # Design task
-    execute_agent_task(
-        "designer",
-        "Design microservice dashboard UI",
-        "design_001",
-        8,
-        "Designer Agent - Create UI/UX"
-    )
-    
-    # Analytics task
-    execute_agent_task(
-        "analyst",
-        "Analyze system performance metrics",
-        "analyze_001",
-        9,
-        "Analyst Agent - Process Metrics"
-    )
-    
-    # Security audit
-    execute_agent_task(
-        "security",
-        "Audit microservice security",
-        "security_001",
-        10,
-        "Security Agent - Security Audit"
-    )
+async def run_design_and_analysis(client):
+    """Execute design, analysis and security tasks."""
+    await execute_concurrently(client, [
+        ("designer", "Design microservice dashboard UI", "design_001",
+         8, "Designer Agent - Create UI/UX"),
+        ("analyst", "Analyze system performance metrics", "analyze_001",
+         9, "Analyst Agent - Process Metrics"),
+        ("security", "Audit microservice security", "security_001",
+         10, "Security Agent - Security Audit"),
+    ])
 
 
-def run_deployment_workflow():
+async def run_deployment_workflow(client):
     """Execute deployment and monitoring tasks."""
-    # Deployment task
-    execute_agent_task(
+    # Deployment task (uses the validation result)
+    await execute_agent_task(
+        client,
         "deployer",
         "production",
         "deploy_001",
@@ -137,8 +126,9 @@ def run_deployment_workflow():
         "Deployer Agent - Manage CI/CD"
     )
     
-    # Monitoring task
-    execute_agent_task(
+    # Monitoring task (uses the deployment info)
+    await execute_agent_task(
+        client,
         "monitor",
         "all",
         "monitor_001",
@@ -147,25 +137,25 @@ def run_deployment_workflow():
     )
 
 
-def check_status():
+async def check_status(client):
     """Check agent and task status."""
-    # Get agent status
-    response = requests.get(f"{BASE_URL}/agents/researcher/status", timeout=5)
-    print_response("13. Get Researcher Agent Status", response)
-    
-    # Get task status
-    response = requests.get(f"{BASE_URL}/tasks/research_001", timeout=10)
-    print_response("14. Get Task Status", response)
+    agent_status, task_status = await asyncio.gather(
+        client.get("/agents/researcher/status", timeout=5),
+        client.get("/tasks/research_001", timeout=10)
+    )
+    print_response("13. Get Researcher Agent Status", agent_status)
+    print_response("14. Get Task Status", task_status)
 
 
-def main():
+async def main():
     """Demonstrate the multi-agent system."""
-    get_system_info()
-    run_research_workflow()
-    run_planning_workflow()
-    run_design_and_analysis()
-    run_deployment_workflow()
-    check_status()
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=DEFAULT_TIMEOUT) as client:
+        await get_system_info(client)
+        await run_research_workflow(client)
+        await run_planning_workflow(client)
+        await run_design_and_analysis(client)
+        await run_deployment_workflow(client)
+        await check_status(client)
     
     print("\n" + "=" * 60)
     print("Example completed successfully!")
@@ -174,8 +164,8 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
-    except requests.exceptions.ConnectionError:
+        asyncio.run(main())
+    except httpx.ConnectError:
         print("\nError: Could not connect to the API server.")
         print("Please make sure the server is running:")
         print("  python main.py")
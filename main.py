@@ -1,17 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import os
 import uvicorn
 from memory import RedisMemory
+from memory_async import AsyncRedisMemory
 from agents import (
     ResearcherAgent, CoderAgent, PlannerAgent, ValidatorAgent,
     DesignerAgent, AnalystAgent, SecurityAgent, DeployerAgent, MonitorAgent
 )
+from agents.base_agent import CONTEXT_CHANNEL
+from agents.workflow import run_workflow
+
+# Responses are rendered with orjson when it is installed; ORJSONResponse
+# fails on every response without it, so fall back to the stdlib encoder.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Send queued bookkeeping writes and release the async Redis client on shutdown."""
+    yield
+    if memory:
+        await asyncio.to_thread(memory.flush)
+    if async_memory:
+        await async_memory.close()
+
 
 app = FastAPI(
     title="Multi-Agent AI System",
     description="A sophisticated multi-agent system with REST API communication",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultResponse,
+    lifespan=lifespan
 )
 
 # Initialize Redis memory
@@ -22,6 +49,10 @@ except Exception as e:
     print("Make sure Redis is running. You can start it with: docker run -d -p 6379:6379 redis:alpine")
     memory = None
 
+# Request handlers await this instead of borrowing a thread per Redis call;
+# agents keep using the synchronous memory from their worker threads.
+async_memory = AsyncRedisMemory() if memory else None
+
 # Initialize agents
 agents = {}
 if memory:
@@ -37,6 +68,14 @@ if memory:
         "monitor": MonitorAgent(memory)
     }
 
+# Agents are fixed at startup, so their names are computed once
+AGENT_NAMES = tuple(agents)
+AGENT_NAMES_STR = ", ".join(AGENT_NAMES)
+
+
+# Per-task fields written by BaseAgent.process_task; status must come first
+TASK_FIELDS = ("status", "agent", "started_at", "completed_at", "failed_at", "result", "error")
+
 
 class TaskRequest(BaseModel):
     task: str
@@ -48,13 +87,24 @@ class ContextRequest(BaseModel):
     value: Any
 
 
+class WorkflowStep(BaseModel):
+    agent: str
+    task: str
+    task_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class WorkflowRequest(BaseModel):
+    steps: List[WorkflowStep]
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
     return {
         "status": "online",
         "service": "Multi-Agent AI System",
-        "agents": list(agents.keys()),
+        "agents": AGENT_NAMES,
         "redis_connected": memory is not None
     }
 
@@ -65,36 +115,61 @@ async def execute_agent(agent_name: str, request: TaskRequest):
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    if agent_name not in agents:
+    agent = agents.get(agent_name)
+    if agent is None:
         raise HTTPException(
             status_code=404,
-            detail=f"Agent '{agent_name}' not found. Available agents: {list(agents.keys())}"
+            detail=f"Agent '{agent_name}' not found. Available agents: {AGENT_NAMES_STR}"
         )
     
-    agent = agents[agent_name]
     task_data = {
         "task": request.task,
         "task_id": request.task_id,
         "metadata": request.metadata or {}
     }
     
-    result = agent.process_task(task_data)
+    # process_task talks to Redis synchronously; keep it off the event loop
+    result = await asyncio.to_thread(agent.process_task, task_data)
     return result
 
 
+@app.post("/workflow/run")
+async def execute_workflow(request: WorkflowRequest):
+    """Execute several agent tasks in order within a single request."""
+    if not memory:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    
+    steps = []
+    for step in request.steps:
+        agent = agents.get(step.agent)
+        if agent is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Agent '{step.agent}' not found. Available agents: {AGENT_NAMES_STR}"
+            )
+        steps.append((agent, {
+            "task": step.task,
+            "task_id": step.task_id,
+            "metadata": step.metadata or {}
+        }))
+    
+    results = await asyncio.to_thread(run_workflow, steps, memory)
+    return {"results": results}
+
+
 @app.get("/agents/{agent_name}/status")
 async def get_agent_status(agent_name: str):
     """Get the current status of an agent."""
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    if agent_name not in agents:
+    agent = agents.get(agent_name)
+    if agent is None:
         raise HTTPException(
             status_code=404,
-            detail=f"Agent '{agent_name}' not found. Available agents: {list(agents.keys())}"
+            detail=f"Agent '{agent_name}' not found. Available agents: {AGENT_NAMES_STR}"
         )
     
-    agent = agents[agent_name]
     return agent.get_status()
 
 
@@ -118,20 +193,38 @@ async def get_context(key: str):
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    value = memory.get(f"context:{key}")
+    value = await async_memory.get(f"context:{key}")
     if value is None:
         raise HTTPException(status_code=404, detail=f"Context key '{key}' not found")
     
     return {"key": key, "value": value}
 
 
+@app.get("/context/{key}/wait")
+async def wait_for_context(key: str, timeout: float = Query(2.0, gt=0, le=30)):
+    """Retrieve shared context, waiting up to `timeout` seconds for it to be set."""
+    if not memory:
+        raise HTTPException(status_code=503, detail="Redis connection not available")
+    
+    value = await async_memory.wait_for(f"context:{key}", CONTEXT_CHANNEL, timeout)
+    if value is None:
+        raise HTTPException(status_code=404, detail=f"Context key '{key}' not set within {timeout}s")
+    
+    return {"key": key, "value": value}
+
+
 @app.post("/context/{key}")
 async def set_context(key: str, request: ContextRequest):
     """Store shared context in memory."""
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    success = memory.set(f"context:{key}", request.value)
+    try:
+        success = await async_memory.set_and_publish(f"context:{key}", request.value, CONTEXT_CHANNEL)
+    except (TypeError, OverflowError, ValueError) as e:
+        # Valid JSON the serializer cannot store, e.g. integers beyond 64 bits
+        raise HTTPException(status_code=422, detail=f"Context value cannot be stored: {str(e)}")
+    memory.invalidate_local(f"context:{key}")
     return {"key": key, "success": success}
 
 
@@ -141,7 +234,8 @@ async def delete_context(key: str):
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    success = memory.delete(f"context:{key}")
+    success = await async_memory.delete_one(f"context:{key}")
+    memory.invalidate_local(f"context:{key}")
     if not success:
         raise HTTPException(status_code=404, detail=f"Context key '{key}' not found")
     
@@ -154,23 +248,26 @@ async def get_task_status(task_id: str):
     if not memory:
         raise HTTPException(status_code=503, detail="Redis connection not available")
     
-    status = memory.get(f"task:{task_id}:status")
-    if not status:
+    keys = [f"task:{task_id}:{field}" for field in TASK_FIELDS]
+    values = await async_memory.get_many(keys)
+    if not values[0]:
         raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found")
     
-    task_info = {
-        "task_id": task_id,
-        "status": status,
-        "agent": memory.get(f"task:{task_id}:agent"),
-        "started_at": memory.get(f"task:{task_id}:started_at"),
-        "completed_at": memory.get(f"task:{task_id}:completed_at"),
-        "failed_at": memory.get(f"task:{task_id}:failed_at"),
-        "result": memory.get(f"task:{task_id}:result"),
-        "error": memory.get(f"task:{task_id}:error")
-    }
+    task_info = {"task_id": task_id}
+    task_info.update(zip(TASK_FIELDS, values))
     
     return task_info
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # Workers need an import string; each worker process imports this module
+    # and builds its own RedisMemory and agents. "auto" picks uvloop and
+    # httptools when installed (uvicorn[standard]) and falls back otherwise.
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("API_HOST", "127.0.0.1"),
+        port=int(os.getenv("API_PORT", 8000)),
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="auto",
+        http="auto"
+    )
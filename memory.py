@@ -1,85 +1,785 @@
 import redis
-import json
+import msgpack
+import logging
+from collections import OrderedDict
+import functools
+import inspect
 import os
-from typing import Any, Optional
-from datetime import timedelta
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# JSON goes through orjson (Rust, writes bytes directly) when it is
+# installed; the stdlib fallback produces the same compact UTF-8 output.
+try:
+    import orjson
+    
+    def _json_dumps(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    
+    def _json_dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    
+    _json_loads = json.loads
+
+# Values are stored as msgpack behind a one-byte format marker. JSON text
+# never starts with this byte, so keys written before the switch to msgpack
+# are still readable as JSON.
+MSGPACK_PREFIX = b"\x01"
+
+# Background write flushing: send a pipeline once this many writes are
+# queued, or after this many seconds, whichever comes first.
+WRITE_BATCH_SIZE = 256
+WRITE_FLUSH_INTERVAL = 0.005
+
+# In-process cache of recently written/read values. Entries expire so that
+# writes from other processes become visible within the TTL.
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL_MS = 1000
+
+# Packed lists are rewritten in full on every append, so past this many items
+# a warning suggests switching that key to append_to_list.
+PACKED_LIST_WARN_ITEMS = 1000
+
+# clear_all scans and unlinks namespaced keys this many at a time
+CLEAR_BATCH_SIZE = 500
+
+# Connection pools shared by every RedisMemory using the same server, and the
+# servers already checked with a ping. A blocking pool makes callers wait for
+# a free connection instead of failing when all of them are in use.
+POOL_MAX_CONNECTIONS = 32
+_POOLS = {}
+_PINGED = set()
+_POOLS_LOCK = threading.Lock()
+
+# Client-side caching (REDIS_CLIENT_TRACKING=1, Redis 6+): Redis publishes
+# the names of changed keys on this channel to the connection named by
+# CLIENT TRACKING ... REDIRECT. Lost connections are retried after the delay.
+# BCAST mode also reports this process's own writes, so invalidations for
+# keys it wrote within the window (in seconds) are ignored.
+INVALIDATE_CHANNEL = b"__redis__:invalidate"
+TRACKING_RETRY_DELAY = 1.0
+TRACKING_OWN_WRITE_WINDOW = 0.05
+
+
+def _glob_escape(pattern: bytes) -> bytes:
+    """Escape the characters SCAN MATCH treats as wildcards."""
+    for char in (b"\\", b"*", b"?", b"[", b"]"):
+        pattern = pattern.replace(char, b"\\" + char)
+    return pattern
+
+
+def _get_pool(host: str, port: int) -> redis.ConnectionPool:
+    """Return the shared connection pool for a server, creating it on first use."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get((host, port))
+        if pool is None:
+            pool = redis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                max_connections=POOL_MAX_CONNECTIONS,
+                socket_connect_timeout=5,
+                socket_keepalive=True
+            )
+            _POOLS[(host, port)] = pool
+        return pool
+
+
+def _encode_msgpack(value: Any) -> bytes:
+    """Serialize a value as prefixed msgpack."""
+    return MSGPACK_PREFIX + msgpack.packb(value, use_bin_type=True)
+
+
+def _encode_json(value: Any) -> bytes:
+    """Serialize a value as JSON (human-readable in redis-cli)."""
+    return _json_dumps(value)
+
+
+_ENCODERS = {
+    "msgpack": _encode_msgpack,
+    "json": _encode_json,
+}
+
+# Short strings such as statuses and agent names are written over and over;
+# their encodings are memoized. Small dicts are not: building a hashable key
+# for one costs as much as packing it.
+SMALL_STR_MAX_LEN = 32
+SMALL_STR_CACHE_SIZE = 512
+
+# Encodings of values passed to register_constant, per serializer and keyed
+# by id(). The values themselves are kept alive so their ids stay unique.
+_PINNED = {name: {} for name in _ENCODERS}
+_PINNED_VALUES = []
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _is_immutable(value: Any) -> bool:
+    """Return whether a value, including any tuple items, can never change."""
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return isinstance(value, _IMMUTABLE_TYPES)
+
+
+def register_constant(value: Any) -> Any:
+    """Pre-encode an immutable value that is written repeatedly and return it.
+    
+    Writes reuse the stored bytes only when given this same object (an
+    equal copy is encoded as usual), so keep the returned value in a
+    module-level constant: every registration is kept for the life of the
+    process.
+    """
+    if not _is_immutable(value):
+        raise TypeError(f"Only immutable values can be registered, not {type(value).__name__}")
+    _PINNED_VALUES.append(value)
+    for name, encode in _ENCODERS.items():
+        _PINNED[name][id(value)] = encode(value)
+    return value
+
+
+def _specialize(name: str):
+    """Build the encoder for a serializer, reusing pinned and short-string encodings."""
+    encode = _ENCODERS[name]
+    pinned = _PINNED[name]
+    encode_small = functools.lru_cache(maxsize=SMALL_STR_CACHE_SIZE)(encode)
+    
+    def encode_value(value: Any) -> bytes:
+        encoded = pinned.get(id(value))
+        if encoded is not None:
+            return encoded
+        if type(value) is str and len(value) <= SMALL_STR_MAX_LEN:
+            return encode_small(value)
+        return encode(value)
+    
+    return encode_value
+
+
+SERIALIZERS = {name: _specialize(name) for name in _ENCODERS}
+
+
+def _decode(raw) -> Any:
+    """Deserialize a stored value, accepting both msgpack and legacy JSON."""
+    if raw[:1] == MSGPACK_PREFIX:
+        return msgpack.unpackb(memoryview(raw)[1:], raw=False, strict_map_key=False)
+    return _json_loads(raw)
+
+
+def _decode_many(values: list) -> list:
+    """Deserialize stored values, in a single msgpack pass when all are msgpack."""
+    if values and all(v[:1] == MSGPACK_PREFIX for v in values):
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(b"".join([v[1:] for v in values]))
+        return list(unpacker)
+    return [_decode(v) for v in values]
+
+
+def _redis_op(action: str):
+    """Decorate a memory method so Redis errors surface as RuntimeError.
+    
+    The message reads "Failed to <action> <first argument>: <error>". Other
+    exceptions, such as a value the serializer rejects, propagate unchanged.
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                try:
+                    return await method(self, *args, **kwargs)
+                except redis.RedisError as e:
+                    raise RuntimeError(_op_failed(action, args, e)) from e
+            return async_wrapper
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except redis.RedisError as e:
+                raise RuntimeError(_op_failed(action, args, e)) from e
+        return wrapper
+    return decorator
+
+
+def _op_failed(action: str, args: tuple, error: Exception) -> str:
+    """Build the error message for a failed memory operation.
+    
+    Only keys are named: a mapping argument is reduced to its keys, and
+    any other non-key argument is left out so values never reach logs.
+    """
+    subject = args[0] if args else None
+    if isinstance(subject, dict):
+        subject = list(subject)
+    if isinstance(subject, (str, bytes, list)):
+        action = f"{action} {subject}"
+    return f"Failed to {action}: {str(error)}"
+
+
+class MemoryPipeline:
+    """Batch of RedisMemory commands sent to Redis in one round trip.
+    
+    Values queued with set() are serialized like RedisMemory.set, and
+    execute() returns decoded values for queued get() calls.
+    """
+    
+    def __init__(self, memory: "RedisMemory", transaction: bool = False):
+        self._memory = memory
+        self._pipe = memory.client.pipeline(transaction=transaction)
+        self._is_get = []
+        self._written = []
+        self._deleted = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.reset()
+    
+    def set(self, key: str, value: Any, ttl: int = None) -> "MemoryPipeline":
+        """Queue storing a value."""
+        serialized = self._memory._encode(value)
+        self._pipe.set(self._memory._full_key(key), serialized, ex=ttl or None)
+        self._written.append((key, serialized))
+        self._is_get.append(False)
+        return self
+    
+    def get(self, key: str) -> "MemoryPipeline":
+        """Queue retrieving a value."""
+        self._pipe.get(self._memory._full_key(key))
+        self._is_get.append(True)
+        return self
+    
+    def delete(self, key: str) -> "MemoryPipeline":
+        """Queue deleting a key."""
+        self._pipe.delete(self._memory._full_key(key))
+        self._deleted.append(key)
+        self._is_get.append(False)
+        return self
+    
+    def publish(self, channel: str, message: str) -> "MemoryPipeline":
+        """Queue publishing a message on a channel."""
+        self._pipe.publish(channel, message)
+        self._is_get.append(False)
+        return self
+    
+    @_redis_op("execute pipeline")
+    def execute(self) -> list:
+        """Send all queued commands and return their results in order."""
+        is_get, written, deleted = self._is_get, self._written, self._deleted
+        self._is_get, self._written, self._deleted = [], [], []
+        results = self._pipe.execute()
+        
+        for key, serialized in written:
+            self._memory._cache_put(key, serialized)
+        for key in deleted:
+            self._memory._cache_drop(key)
+        return [
+            (_decode(result) if result else None) if get else result
+            for get, result in zip(is_get, results)
+        ]
+    
+    def reset(self) -> None:
+        """Discard any queued commands."""
+        self._pipe.reset()
+        self._is_get, self._written, self._deleted = [], [], []
 
 
 class RedisMemory:
-    """Redis-based memory manager for shared context across agents."""
+    """Redis-based memory manager for shared context across agents.
+    
+    Values are written with the chosen serializer ("msgpack" or "json");
+    reads accept either format. With a namespace, every key is stored as
+    "<namespace>:<key>" so several deployments can share one database.
+    """
     
-    def __init__(self, host: str = None, port: int = None):
+    def __init__(self, host: str = None, port: int = None,
+                 cache_size: int = LOCAL_CACHE_SIZE, cache_ttl_ms: int = LOCAL_CACHE_TTL_MS,
+                 serializer: str = None, namespace: str = None):
         self.host = host or os.getenv("REDIS_HOST", "localhost")
         self.port = port or int(os.getenv("REDIS_PORT", 6379))
+        self.serializer = serializer or os.getenv("REDIS_SERIALIZER", "msgpack")
+        if self.serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer '{self.serializer}'. Available: {list(SERIALIZERS)}")
+        self._encode = SERIALIZERS[self.serializer]
+        self.namespace = namespace if namespace is not None else os.getenv("REDIS_NAMESPACE", "")
+        self._prefix = (self.namespace + ":").encode() if self.namespace else b""
         self.client = None
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl_ms / 1000
+        self._local = OrderedDict()  # key -> (expires_at, serialized, written_at)
+        self._local_lock = threading.Lock()
+        self._generation = 0  # bumped by every local write or invalidation
+        self._write_queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._tracker = None  # connection whose CLIENT TRACKING feeds invalidations
         self._connect()
+        if self.cache_size and os.getenv("REDIS_CLIENT_TRACKING") == "1":
+            self._start_tracking()
     
     def _connect(self):
-        """Establish connection to Redis with retry logic."""
+        """Attach to the shared connection pool, pinging the server once per pool."""
+        try:
+            self.client = redis.Redis(connection_pool=_get_pool(self.host, self.port))
+            # Bound once here to skip the attribute lookups on hot paths
+            self._raw_set = self.client.set
+            self._raw_get = self.client.get
+            self._mget = self.client.mget
+            self._rpush = self.client.rpush
+            self._lrange = self.client.lrange
+            if (self.host, self.port) not in _PINGED:
+                self.client.ping()
+                _PINGED.add((self.host, self.port))
+                if os.getenv("REDIS_SET_EVICTION") == "1":
+                    self._configure_eviction_from_env()
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to connect to Redis: {str(e)}") from e
+    
+    def _configure_eviction_from_env(self):
+        """Apply REDIS_EVICTION_POLICY / REDIS_MAXMEMORY, warning if the server refuses."""
         try:
-            self.client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                decode_responses=True,
-                socket_connect_timeout=5
+            self.configure_eviction(
+                policy=os.getenv("REDIS_EVICTION_POLICY", "allkeys-lru"),
+                max_memory=os.getenv("REDIS_MAXMEMORY") or None
             )
-            self.client.ping()
-        except Exception as e:
-            raise ConnectionError(f"Failed to connect to Redis: {str(e)}")
+        except RuntimeError as e:
+            # Managed Redis services often disable CONFIG; keep the connection
+            logger.warning(str(e))
+    
+    @_redis_op("configure eviction policy")
+    def configure_eviction(self, policy: str = "allkeys-lru", max_memory: str = None) -> bool:
+        """Set the server's eviction policy and, optionally, its memory limit.
+        
+        This changes the whole Redis server, so only call it on instances
+        dedicated to this app. Use "volatile-lru" to evict only keys written
+        with a ttl (the agents' result cache) and never task or context data.
+        """
+        if max_memory:
+            self.client.config_set("maxmemory", max_memory)
+        return bool(self.client.config_set("maxmemory-policy", policy))
+    
+    def _full_key(self, key):
+        """Return the key as sent to Redis, namespaced as prefixed bytes."""
+        if self._prefix:
+            return self._prefix + (key.encode() if isinstance(key, str) else key)
+        return key
     
+    def _open_tracking(self) -> redis.Connection:
+        """Subscribe a dedicated connection to invalidations and return it.
+        
+        BCAST mode reports every change under the namespace rather than
+        only keys read on one connection, so it covers reads made through
+        any pooled connection.
+        """
+        listener = redis.Connection(host=self.host, port=self.port,
+                                    socket_connect_timeout=5, socket_keepalive=True)
+        listener.send_command("CLIENT", "ID")
+        listener_id = listener.read_response()
+        listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+        listener.read_response()
+        
+        # Tracking lasts as long as the connection that enabled it
+        if self._tracker is not None:
+            self._tracker.disconnect()
+        self._tracker = redis.Connection(host=self.host, port=self.port,
+                                         socket_connect_timeout=5, socket_keepalive=True)
+        self._tracker.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", listener_id,
+                                   "BCAST", "PREFIX", self._prefix)
+        self._tracker.read_response()
+        return listener
+    
+    def _start_tracking(self):
+        """Start dropping local cache entries as soon as Redis reports them changed.
+        
+        Requires a namespace: without a PREFIX, every process would be sent
+        every key written anywhere in the database.
+        """
+        if not self._prefix:
+            logger.warning("Client tracking needs REDIS_NAMESPACE, relying on the local cache TTL")
+            return
+        try:
+            listener = self._open_tracking()
+        except redis.RedisError as e:
+            logger.warning(f"Client tracking unavailable, relying on the local cache TTL: {str(e)}")
+            return
+        threading.Thread(
+            target=self._listen_invalidations,
+            args=(listener,),
+            name="redis-memory-invalidations",
+            daemon=True
+        ).start()
+    
+    def _listen_invalidations(self, listener):
+        """Apply invalidation messages, reconnecting if the listener drops (runs forever)."""
+        while True:
+            try:
+                if listener is None:
+                    listener = self._open_tracking()
+                message = listener.read_response()
+            except redis.RedisError as e:
+                logger.warning(f"Lost client tracking connection, retrying: {str(e)}")
+                if listener is not None:
+                    listener.disconnect()
+                listener = None
+                # Changes made meanwhile were never reported
+                self._cache_clear()
+                time.sleep(TRACKING_RETRY_DELAY)
+                continue
+            if message[0] == b"message":
+                self._apply_invalidation(message[2])
+    
+    def _apply_invalidation(self, keys: Optional[list]) -> None:
+        """Drop the reported Redis keys from the local cache (None means all).
+        
+        Entries this process wrote within TRACKING_OWN_WRITE_WINDOW are kept,
+        since the report is most likely of that write.
+        """
+        if keys is None:
+            self._cache_clear()
+            return
+        start = len(self._prefix)
+        recent = time.monotonic() - TRACKING_OWN_WRITE_WINDOW
+        with self._local_lock:
+            self._generation += 1
+            for key in keys:
+                key = key[start:].decode(errors="replace")
+                entry = self._local.get(key)
+                if entry is not None and entry[2] < recent:
+                    del self._local[key]
+    
+    def _cache_get(self, key: str):
+        """Return the locally cached serialized value for a key, or None."""
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+    
+    def _cache_store(self, key: str, serialized, own_write: bool = False) -> None:
+        """Insert an entry, evicting the least recently used one (lock held)."""
+        now = time.monotonic()
+        self._local[key] = (now + self.cache_ttl, serialized, now if own_write else 0.0)
+        self._local.move_to_end(key)
+        if len(self._local) > self.cache_size:
+            self._local.popitem(last=False)
+    
+    def _cache_put(self, key: str, serialized) -> None:
+        """Record a value this process just wrote."""
+        with self._local_lock:
+            self._generation += 1
+            if self.cache_size:
+                self._cache_store(key, serialized, own_write=True)
+    
+    def _cache_fill(self, key: str, serialized, generation: int) -> None:
+        """Cache a value read from Redis, unless a local write raced the read."""
+        with self._local_lock:
+            if self.cache_size and generation == self._generation:
+                self._cache_store(key, serialized)
+    
+    def _cache_drop(self, key: str) -> None:
+        """Remove a key from the local cache."""
+        with self._local_lock:
+            self._generation += 1
+            self._local.pop(key, None)
+    
+    def _cache_clear(self) -> None:
+        """Empty the local cache."""
+        with self._local_lock:
+            self._generation += 1
+            self._local.clear()
+    
+    def invalidate_local(self, key: str) -> None:
+        """Forget the locally cached value of a key written by another client."""
+        self._cache_drop(key)
+    
+    @_redis_op("set key")
     def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Store a value in Redis."""
-        try:
-            serialized = json.dumps(value)
-            if ttl:
-                return self.client.setex(key, timedelta(seconds=ttl), serialized)
-            return self.client.set(key, serialized)
-        except Exception as e:
-            raise RuntimeError(f"Failed to set key {key}: {str(e)}")
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Retrieve a value from Redis."""
-        try:
-            value = self.client.get(key)
+        serialized = self._encode(value)
+        result = bool(self._raw_set(self._full_key(key), serialized, ex=ttl or None))
+        self._cache_put(key, serialized)
+        return result
+    
+    def pipeline(self, transaction: bool = False) -> MemoryPipeline:
+        """Start a batch of commands to send in a single round trip."""
+        return MemoryPipeline(self, transaction=transaction)
+    
+    def pipeline_set(self, mapping: Dict[str, Any], ttl: int = None) -> bool:
+        """Store several values in a single round trip."""
+        with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ttl=ttl)
+            return all(pipe.execute())
+    
+    @_redis_op("set keys")
+    def mset(self, mapping: Dict[str, Any], ttl: int = None) -> bool:
+        """Store several values with one MSET.
+        
+        MSET cannot expire keys, so with a ttl this falls back to pipeline_set.
+        """
+        if not mapping:
+            return True
+        if ttl:
+            return self.pipeline_set(mapping, ttl=ttl)
+        serialized = {key: self._encode(value) for key, value in mapping.items()}
+        result = bool(self.client.mset({self._full_key(key): value for key, value in serialized.items()}))
+        for key, value in serialized.items():
+            self._cache_put(key, value)
+        return result
+    
+    def set_async(self, key: str, value: Any, ttl: int = None) -> None:
+        """Queue a write without waiting for Redis to confirm it.
+        
+        Queued writes are applied in order by a background thread, so use
+        this only for bookkeeping that callers do not need durable on return,
+        or call flush() before relying on it.
+        """
+        serialized = self._encode(value)
+        self._cache_put(key, serialized)
+        self._enqueue("set", key, serialized, ttl)
+    
+    def append_async(self, key: str, value: Any) -> None:
+        """Queue appending a value to a list without waiting for Redis.
+        
+        Consecutive queued appends to the same list are flushed as a single
+        variadic RPUSH, so streaming producers need not batch by hand.
+        """
+        serialized = self._encode(value)
+        self._enqueue("rpush", key, serialized)
+    
+    def _enqueue(self, command: str, key: str, serialized, ttl: int = None) -> None:
+        """Hand a write to the background writer, starting it if needed."""
+        self._write_queue.put((command, self._full_key(key), serialized, ttl))
+        if self._writer is None:
+            self._start_writer()
+    
+    def flush(self) -> None:
+        """Block until every write queued so far has been sent to Redis.
+        
+        Waits on a marker queued behind those writes, so writes other
+        threads queue meanwhile do not hold it up.
+        """
+        if self._writer is None:
+            return
+        flushed = threading.Event()
+        self._write_queue.put(("flush", None, flushed, None))
+        flushed.wait()
+    
+    def _start_writer(self):
+        """Start the background thread that flushes queued writes."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._flush_writes,
+                    name="redis-memory-writer",
+                    daemon=True
+                )
+                self._writer.start()
+    
+    def _flush_writes(self):
+        """Drain the write queue in pipelined batches (runs forever).
+        
+        Results are discarded; failures are only logged.
+        """
+        pipe = self.client.pipeline(transaction=False)
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+            # A flush() marker ends the batch so its caller is not kept waiting
+            while len(batch) < WRITE_BATCH_SIZE and batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                pending = []  # run of consecutive appends to one list
+                for command, key, serialized, ttl in batch:
+                    if pending and (command != "rpush" or key != pending_key):
+                        pipe.rpush(pending_key, *pending)
+                        pending = []
+                    if command == "rpush":
+                        pending_key = key
+                        pending.append(serialized)
+                    elif command == "set":
+                        pipe.set(key, serialized, ex=ttl or None)
+                if pending:
+                    pipe.rpush(pending_key, *pending)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} queued writes: {str(e)}")
+            finally:
+                for command, _, flushed, _ in batch:
+                    if command == "flush":
+                        flushed.set()
+                    self._write_queue.task_done()
+    
+    @_redis_op("get key")
+    def get(self, key: str, local_cache: bool = True) -> Optional[Any]:
+        """Retrieve a value, serving recent values from the local cache.
+        
+        Pass local_cache=False to always read from Redis, e.g. for keys that
+        other processes are known to have just written.
+        """
+        value = self._cache_get(key) if local_cache else None
+        if value is None:
+            generation = self._generation
+            value = self._raw_get(self._full_key(key))
             if value:
-                return json.loads(value)
-            return None
-        except Exception as e:
-            raise RuntimeError(f"Failed to get key {key}: {str(e)}")
+                self._cache_fill(key, value, generation)
+        if value:
+            return _decode(value)
+        return None
     
-    def delete(self, key: str) -> bool:
-        """Delete a key from Redis."""
-        try:
-            return self.client.delete(key) > 0
-        except Exception as e:
-            raise RuntimeError(f"Failed to delete key {key}: {str(e)}")
+    @_redis_op("get keys")
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Retrieve several values in a single round trip."""
+        values = self._mget([self._full_key(key) for key in keys])
+        return [_decode(v) if v else None for v in values]
     
-    def exists(self, key: str) -> bool:
-        """Check if a key exists."""
-        try:
-            return self.client.exists(key) > 0
-        except Exception as e:
-            raise RuntimeError(f"Failed to check key {key}: {str(e)}")
+    def mget(self, keys: List[str]) -> Dict[str, Optional[Any]]:
+        """Retrieve several values with one MGET, keyed by name."""
+        return dict(zip(keys, self.get_many(keys)))
     
+    @_redis_op("delete key")
+    def delete(self, *keys: str) -> int:
+        """Delete keys from Redis with one DEL and return how many existed."""
+        if not keys:
+            return 0
+        deleted = self.client.delete(*[self._full_key(key) for key in keys])
+        for key in keys:
+            self._cache_drop(key)
+        return deleted
+    
+    def delete_one(self, key: str) -> bool:
+        """Delete a single key, returning whether it existed."""
+        return bool(self.delete(key))
+    
+    @_redis_op("check key")
+    def exists(self, *keys: str) -> int:
+        """Count how many of the keys exist (repeated keys count each time)."""
+        if not keys:
+            return 0
+        return self.client.exists(*[self._full_key(key) for key in keys])
+    
+    def exists_one(self, key: str) -> bool:
+        """Check if a single key exists."""
+        return bool(self.exists(key))
+    
+    @_redis_op("append to list")
     def append_to_list(self, key: str, value: Any) -> int:
         """Append a value to a list."""
-        try:
-            serialized = json.dumps(value)
-            return self.client.rpush(key, serialized)
-        except Exception as e:
-            raise RuntimeError(f"Failed to append to list {key}: {str(e)}")
+        serialized = self._encode(value)
+        return self._rpush(self._full_key(key), serialized)
+    
+    @_redis_op("append to list")
+    def append_many(self, key: str, values: List[Any]) -> int:
+        """Append several values to a list in a single RPUSH."""
+        if not values:
+            return 0
+        serialized = [self._encode(value) for value in values]
+        return self._rpush(self._full_key(key), *serialized)
     
+    @_redis_op("get list")
     def get_list(self, key: str) -> list:
         """Get all values from a list."""
+        values = self._lrange(self._full_key(key), 0, -1)
+        return _decode_many(values)
+    
+    @_redis_op("append to packed list")
+    def append_to_packed_list(self, key: str, value: Any) -> int:
+        """Append a value to a list stored as one serialized array.
+        
+        Unlike append_to_list this rewrites the whole array (optimistically
+        locked with WATCH), so each append costs O(n) in the list size; in
+        exchange get_packed_list needs one GET and one decode. Use it for
+        small lists that are mostly read in full, such as agent findings.
+        """
+        full_key = self._full_key(key)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(full_key)
+                    raw = pipe.get(full_key)
+                    items = _decode(raw) if raw else []
+                    items.append(value)
+                    serialized = self._encode(items)
+                    pipe.multi()
+                    pipe.set(full_key, serialized)
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    continue
+        self._cache_put(key, serialized)
+        if len(items) == PACKED_LIST_WARN_ITEMS + 1:
+            logger.warning(
+                f"Packed list {key} exceeded {PACKED_LIST_WARN_ITEMS} items; "
+                f"appends rewrite the whole list, consider append_to_list"
+            )
+        return len(items)
+    
+    def get_packed_list(self, key: str) -> list:
+        """Get all values from a list written by append_to_packed_list."""
+        return self.get(key) or []
+    
+    @_redis_op("publish to")
+    def publish(self, channel: str, message: str) -> int:
+        """Publish a message on a channel."""
+        return self.client.publish(channel, message)
+    
+    @_redis_op("wait for key")
+    def wait_for(self, key: str, channel: str, timeout: float) -> Optional[Any]:
+        """Retrieve a value, waiting up to timeout seconds for it to be set.
+        
+        Writers announce a key by publishing its name on channel; the
+        subscription is opened before the first read so no update is missed.
+        """
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
         try:
-            values = self.client.lrange(key, 0, -1)
-            return [json.loads(v) for v in values]
-        except Exception as e:
-            raise RuntimeError(f"Failed to get list {key}: {str(e)}")
+            pubsub.subscribe(channel)
+            value = self.get(key)
+            deadline = time.monotonic() + timeout
+            while value is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                message = pubsub.get_message(timeout=remaining)
+                if message and message["data"] == key.encode():
+                    value = self.get(key)
+            return value
+        finally:
+            pubsub.close()
     
+    @_redis_op("clear database")
     def clear_all(self) -> bool:
-        """Clear all keys (use with caution)."""
-        try:
+        """Clear all keys (use with caution).
+        
+        With a namespace only that namespace's keys are removed (found with
+        SCAN, deleted with UNLINK in batches); otherwise the whole database
+        is flushed.
+        """
+        if not self._prefix:
+            self._cache_clear()
             return self.client.flushdb()
-        except Exception as e:
-            raise RuntimeError(f"Failed to clear database: {str(e)}")
+        pattern = _glob_escape(self._prefix) + b"*"
+        batch = []
+        for key in self.client.scan_iter(match=pattern, count=CLEAR_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) == CLEAR_BATCH_SIZE:
+                self.client.unlink(*batch)
+                batch = []
+        if batch:
+            self.client.unlink(*batch)
+        self._cache_clear()
+        return True
@@ -0,0 +1,195 @@
+import redis.asyncio as aioredis
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+from memory import SERIALIZERS, _decode, _decode_many, _redis_op
+
+# Connection pools shared by every AsyncRedisMemory using the same server.
+# Larger than the sync pool since every in-flight request can hold one. Like
+# the sync pool it blocks, for up to the timeout in seconds, when exhausted.
+ASYNC_POOL_MAX_CONNECTIONS = 64
+ASYNC_POOL_TIMEOUT = 20
+_ASYNC_POOLS = {}
+
+# Each wait_for holds a pub/sub connection and borrows a second one for its
+# reads. Capping concurrent waits keeps half the pool free for other requests
+# (and waiters from starving each other); the rest queue for a slot.
+MAX_CONCURRENT_WAITS = ASYNC_POOL_MAX_CONNECTIONS // 4
+
+
+def _get_async_pool(host: str, port: int) -> aioredis.ConnectionPool:
+    """Return the shared asyncio connection pool for a server, creating it on first use."""
+    pool = _ASYNC_POOLS.get((host, port))
+    if pool is None:
+        pool = aioredis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            max_connections=ASYNC_POOL_MAX_CONNECTIONS,
+            timeout=ASYNC_POOL_TIMEOUT,
+            socket_connect_timeout=5,
+            socket_keepalive=True
+        )
+        _ASYNC_POOLS[(host, port)] = pool
+    return pool
+
+
+class AsyncRedisMemory:
+    """asyncio counterpart of RedisMemory for use inside request handlers.
+    
+    Values and namespaced keys use the same encodings as RedisMemory, so
+    both can share keys.
+    There is no local cache: every call goes to Redis while the event loop
+    serves other requests. Connections are opened on first use.
+    """
+    
+    def __init__(self, host: str = None, port: int = None, serializer: str = None,
+                 namespace: str = None):
+        self.host = host or os.getenv("REDIS_HOST", "localhost")
+        self.port = port or int(os.getenv("REDIS_PORT", 6379))
+        self.serializer = serializer or os.getenv("REDIS_SERIALIZER", "msgpack")
+        if self.serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer '{self.serializer}'. Available: {list(SERIALIZERS)}")
+        self._encode = SERIALIZERS[self.serializer]
+        self.namespace = namespace if namespace is not None else os.getenv("REDIS_NAMESPACE", "")
+        self._prefix = (self.namespace + ":").encode() if self.namespace else b""
+        self.client = aioredis.Redis(connection_pool=_get_async_pool(self.host, self.port))
+        self._wait_slots = None  # created on first wait_for, inside the event loop
+    
+    def _full_key(self, key):
+        """Return the key as sent to Redis, namespaced as prefixed bytes."""
+        if self._prefix:
+            return self._prefix + (key.encode() if isinstance(key, str) else key)
+        return key
+    
+    async def ping(self) -> bool:
+        """Check that Redis is reachable."""
+        try:
+            return await self.client.ping()
+        except aioredis.RedisError as e:
+            raise ConnectionError(f"Failed to connect to Redis: {str(e)}") from e
+    
+    @_redis_op("set key")
+    async def set(self, key: str, value: Any, ttl: int = None) -> bool:
+        """Store a value in Redis."""
+        serialized = self._encode(value)
+        return bool(await self.client.set(self._full_key(key), serialized, ex=ttl or None))
+    
+    @_redis_op("set key")
+    async def set_and_publish(self, key: str, value: Any, channel: str) -> bool:
+        """Store a value and announce its key on a channel in one round trip."""
+        serialized = self._encode(value)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self._full_key(key), serialized)
+            pipe.publish(channel, key)
+            stored, _ = await pipe.execute()
+        return bool(stored)
+    
+    @_redis_op("set keys")
+    async def mset(self, mapping: Dict[str, Any], ttl: int = None) -> bool:
+        """Store several values in one round trip (MSET, or SET EX when ttl is given)."""
+        if not mapping:
+            return True
+        serialized = {self._full_key(key): self._encode(value) for key, value in mapping.items()}
+        if not ttl:
+            return bool(await self.client.mset(serialized))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in serialized.items():
+                pipe.set(key, value, ex=ttl)
+            return all(await pipe.execute())
+    
+    @_redis_op("get key")
+    async def get(self, key: str) -> Optional[Any]:
+        """Retrieve a value from Redis."""
+        value = await self.client.get(self._full_key(key))
+        if value:
+            return _decode(value)
+        return None
+    
+    @_redis_op("get keys")
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Retrieve several values in a single round trip."""
+        values = await self.client.mget([self._full_key(key) for key in keys])
+        return [_decode(v) if v else None for v in values]
+    
+    async def mget(self, keys: List[str]) -> Dict[str, Optional[Any]]:
+        """Retrieve several values with one MGET, keyed by name."""
+        return dict(zip(keys, await self.get_many(keys)))
+    
+    @_redis_op("delete key")
+    async def delete(self, *keys: str) -> int:
+        """Delete keys from Redis with one DEL and return how many existed."""
+        if not keys:
+            return 0
+        return await self.client.delete(*[self._full_key(key) for key in keys])
+    
+    async def delete_one(self, key: str) -> bool:
+        """Delete a single key, returning whether it existed."""
+        return bool(await self.delete(key))
+    
+    @_redis_op("check key")
+    async def exists(self, *keys: str) -> int:
+        """Count how many of the keys exist (repeated keys count each time)."""
+        if not keys:
+            return 0
+        return await self.client.exists(*[self._full_key(key) for key in keys])
+    
+    async def exists_one(self, key: str) -> bool:
+        """Check if a single key exists."""
+        return bool(await self.exists(key))
+    
+    @_redis_op("append to list")
+    async def append_to_list(self, key: str, value: Any) -> int:
+        """Append a value to a list."""
+        return await self.client.rpush(self._full_key(key), self._encode(value))
+    
+    @_redis_op("append to list")
+    async def append_many(self, key: str, values: List[Any]) -> int:
+        """Append several values to a list in a single RPUSH."""
+        if not values:
+            return 0
+        return await self.client.rpush(self._full_key(key), *[self._encode(value) for value in values])
+    
+    @_redis_op("get list")
+    async def get_list(self, key: str) -> list:
+        """Get all values from a list."""
+        return _decode_many(await self.client.lrange(self._full_key(key), 0, -1))
+    
+    @_redis_op("publish to")
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message on a channel."""
+        return await self.client.publish(channel, message)
+    
+    @_redis_op("wait for key")
+    async def wait_for(self, key: str, channel: str, timeout: float) -> Optional[Any]:
+        """Retrieve a value, waiting up to timeout seconds for it to be set.
+        
+        Same protocol as RedisMemory.wait_for, without tying up a thread.
+        Time spent queuing behind other waiters counts against the timeout.
+        """
+        if self._wait_slots is None:
+            self._wait_slots = asyncio.Semaphore(MAX_CONCURRENT_WAITS)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self._wait_slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return await self.get(key)
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            value = await self.get(key)
+            while value is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                message = await pubsub.get_message(timeout=remaining)
+                if message and message["data"] == key.encode():
+                    value = await self.get(key)
+            return value
+        finally:
+            self._wait_slots.release()
+            await pubsub.aclose()
+    
+    async def close(self) -> None:
+        """Close this instance's client; the shared pool stays open."""
+        await self.client.aclose()
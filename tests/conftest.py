@@ -0,0 +1,45 @@
+import fakeredis
+import msgpack
+import pytest
+import redis
+import redis.asyncio as aioredis
+import memory as memory_module
+import memory_async as memory_async_module
+from memory import MSGPACK_PREFIX
+
+
+def packed(value):
+    """Encode a value the way RedisMemory stores it."""
+    return MSGPACK_PREFIX + msgpack.packb(value, use_bin_type=True)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    """Give each test its own connection pools so connect-time pings run."""
+    pools = (memory_module._POOLS, memory_module._PINGED, memory_async_module._ASYNC_POOLS)
+    for pool in pools:
+        pool.clear()
+    yield
+    for pool in pools:
+        pool.clear()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Back RedisMemory and AsyncRedisMemory with an in-process fakeredis server.
+    
+    Only the connection pools are replaced, so the real redis-py clients,
+    pipelines and pub/sub run against it. Returns a client for inspecting
+    what was actually stored.
+    """
+    server = fakeredis.FakeServer()
+    pool = redis.ConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=server)
+    monkeypatch.setattr(memory_module, "_get_pool", lambda host, port: pool)
+    monkeypatch.setattr(
+        memory_async_module,
+        "_get_async_pool",
+        lambda host, port: aioredis.ConnectionPool(
+            connection_class=fakeredis.FakeAsyncRedisConnection, server=server
+        )
+    )
+    return fakeredis.FakeStrictRedis(server=server)
@@ -1,9 +1,15 @@
+import importlib.util
+import sys
 import pytest
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
-from unittest.mock import Mock  # Removed 'patch' since it is unused
+from unittest.mock import MagicMock, Mock, patch
+import main
 from main import app
 from memory import RedisMemory
+from memory_async import AsyncRedisMemory
 from agents import ResearcherAgent, CoderAgent
+from agents.workflow import run_workflow
 
 
 @pytest.fixture
@@ -14,6 +20,12 @@ def mock_memory():
     memory.get.return_value = None
     memory.delete.return_value = True
     memory.exists.return_value = False
+    pipe = MagicMock()
+    pipe.__enter__.return_value = pipe
+    pipe.set.return_value = pipe
+    pipe.publish.return_value = pipe
+    pipe.execute.return_value = [True, 1]
+    memory.pipeline.return_value = pipe
     return memory
 
 
@@ -23,6 +35,23 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture
+def redis_client(fake_redis, monkeypatch):
+    """Create a test client for the app backed by fakeredis.
+    
+    Used as a context manager so every request shares one event loop.
+    """
+    memory = RedisMemory()
+    agents = {"researcher": ResearcherAgent(memory), "coder": CoderAgent(memory)}
+    monkeypatch.setattr(main, "memory", memory)
+    monkeypatch.setattr(main, "async_memory", AsyncRedisMemory())
+    monkeypatch.setattr(main, "agents", agents)
+    monkeypatch.setattr(main, "AGENT_NAMES", tuple(agents))
+    monkeypatch.setattr(main, "AGENT_NAMES_STR", ", ".join(agents))
+    with TestClient(app) as client:
+        yield client
+
+
 def test_root_endpoint(client):
     """Test the root health check endpoint."""
     response = client.get("/")
@@ -86,6 +115,20 @@ def test_agent_retry_logic(mock_memory):
     assert agent.max_retries == 3
 
 
+@patch('agents.base_agent.time.sleep')
+def test_agent_retry_backoff(mock_sleep, mock_memory):
+    """Test that retries back off exponentially before succeeding."""
+    agent = ResearcherAgent(mock_memory)
+    func = Mock(side_effect=[RuntimeError("boom"), RuntimeError("boom"), "ok"])
+    
+    assert agent._retry_wrapper(func) == "ok"
+    
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert len(delays) == 2
+    assert 1 <= delays[0] < 1.1
+    assert 2 <= delays[1] < 2.1
+
+
 def test_agent_process_task(mock_memory):
     """Test the process_task method with error handling."""
     agent = ResearcherAgent(mock_memory)
@@ -99,6 +142,54 @@ def test_agent_process_task(mock_memory):
     assert result["agent"] == "Researcher"
 
 
+def test_agent_process_task_queues_bookkeeping(mock_memory):
+    """Test that only the start bookkeeping is queued and the final status waits on Redis."""
+    agent = ResearcherAgent(mock_memory)
+    
+    agent.process_task({"task": "Test task", "task_id": "test_123"})
+    
+    statuses = [
+        c.args[1] for c in mock_memory.set_async.call_args_list
+        if c.args[0] == "task:test_123:status"
+    ]
+    assert statuses == ["processing"]
+    calls = [name for name, _, _ in mock_memory.method_calls]
+    assert calls.index("flush") < calls.index("pipeline_set")
+    final = mock_memory.pipeline_set.call_args.args[0]
+    assert final["task:test_123:status"] == "completed"
+    assert final["task:test_123:result"]["query"] == "Test task"
+
+
+def test_agent_process_task_cache_hit(mock_memory):
+    """Test that a memoized result is returned without executing."""
+    agent = ResearcherAgent(mock_memory)
+    agent.execute = Mock()
+    mock_memory.get.return_value = [{"summary": "cached"}, {}]
+    
+    result = agent.process_task({"task": "Test task", "task_id": "test_123"})
+    
+    assert result["status"] == "success"
+    assert result["result"] == {"summary": "cached"}
+    agent.execute.assert_not_called()
+    assert mock_memory.get.call_args.args[0].startswith("cache:Researcher:")
+
+
+def test_agent_process_task_no_cache(mock_memory):
+    """Test that the no_cache metadata flag bypasses memoization."""
+    agent = ResearcherAgent(mock_memory)
+    mock_memory.get.return_value = {"summary": "cached"}
+    
+    result = agent.process_task({
+        "task": "Test task",
+        "task_id": "test_123",
+        "metadata": {"no_cache": True}
+    })
+    
+    assert result["result"]["query"] == "Test task"
+    written = [c.args[0] for c in mock_memory.set.call_args_list]
+    assert not any(key.startswith("cache:") for key in written)
+
+
 def test_agent_status(mock_memory):
     """Test getting agent status."""
     agent = ResearcherAgent(mock_memory)
@@ -111,14 +202,150 @@ def test_agent_status(mock_memory):
     assert status["agent"] == "Researcher"
 
 
+def test_agent_status_reflects_changes(mock_memory):
+    """Test that the status payload follows state changes."""
+    agent = ResearcherAgent(mock_memory)
+    
+    assert agent.get_status()["status"] == "idle"
+    agent.status = "processing"
+    assert agent.get_status()["status"] == "processing"
+
+
 def test_agent_context_sharing(mock_memory):
     """Test that agents can share context."""
     agent = ResearcherAgent(mock_memory)
+    pipe = mock_memory.pipeline.return_value
+    
+    # Test set_context (SET and PUBLISH in one round trip)
+    assert agent.set_context("test_key", {"data": "test"}) is True
+    pipe.set.assert_called_once_with("context:test_key", {"data": "test"})
+    pipe.publish.assert_called_once_with("context-updates", "context:test_key")
+    pipe.execute.assert_called_once()
+    mock_memory.set.assert_not_called()
+    mock_memory.publish.assert_not_called()
     
-    # Test set_context
-    agent.set_context("test_key", {"data": "test"})
-    mock_memory.set.assert_called()
+    # Test get_contexts
+    mock_memory.mget.return_value = {"context:test_key": {"data": "test"}, "context:other": None}
+    contexts = agent.get_contexts(["test_key", "other"])
+    assert contexts == {"test_key": {"data": "test"}, "other": None}
+    mock_memory.mget.assert_called_once_with(["context:test_key", "context:other"])
+    mock_memory.get.assert_not_called()
+
+
+def test_run_workflow_shares_context_in_process(mock_memory):
+    """Test that workflow steps hand off context without Redis round trips."""
+    researcher = ResearcherAgent(mock_memory)
+    coder = CoderAgent(mock_memory)
+    pipe = MagicMock()
+    pipe.__enter__.return_value = pipe
+    mock_memory.pipeline.return_value = pipe
+    
+    results = run_workflow([
+        (researcher, {"task": "Research AI trends", "task_id": "research_1"}),
+        (coder, {"task": "Create a Python function", "task_id": "code_1"})
+    ], mock_memory)
+    
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert results[1]["result"]["used_research"] is True
+    mock_memory.get.assert_not_called()
+    mock_memory.set.assert_not_called()
+    
+    pipe.execute.assert_called_once()
+    writes = dict(c.args for c in pipe.set.call_args_list)
+    assert writes["task:code_1:status"] == "completed"
+    assert "context:latest_research" in writes
+    assert "context:latest_code" in writes
+    pipe.publish.assert_any_call("context-updates", "context:latest_code")
+
+
+def test_workflow_invalid_agent(client):
+    """Test running a workflow that names a non-existent agent."""
+    response = client.post(
+        "/workflow/run",
+        json={"steps": [{"agent": "invalid_agent", "task": "Test task"}]}
+    )
+    assert response.status_code in [404, 503]
+
+
+def test_task_status_visible_after_execute(redis_client):
+    """Test that a task's final status is stored by the time execute returns."""
+    for task_id in ("task_1", "task_2", "task_3"):
+        response = redis_client.post(
+            "/agents/coder/execute",
+            json={"task": "Create a Python function", "task_id": task_id}
+        )
+        assert response.json()["status"] == "success"
+        
+        response = redis_client.get(f"/tasks/{task_id}")
+        assert response.status_code == 200
+        task = response.json()
+        assert task["status"] == "completed"
+        assert task["agent"] == "Coder"
+        assert task["completed_at"] is not None
+
+
+def test_agent_cache_hit_replays_context(fake_redis):
+    """Test that a cache hit rewrites the context entries execute() wrote."""
+    agent = ResearcherAgent(RedisMemory())
+    
+    for task_id, query in (("a1", "Task A"), ("b1", "Task B"), ("a2", "Task A")):
+        agent.process_task({"task": query, "task_id": task_id})
+        assert agent.get_context("latest_research")["query"] == query
     
-    # Test get_context
-    agent.get_context("test_key")
-    mock_memory.get.assert_called()
+    agent.memory.delete("context:latest_research")
+    agent.execute = Mock()
+    result = agent.process_task({"task": "Task A", "task_id": "a3"})
+    
+    agent.execute.assert_not_called()
+    assert agent.memory.get("context:latest_research", local_cache=False) == result["result"]
+
+
+def test_set_context_rejects_unstorable_value(redis_client):
+    """Test that values the serializer rejects are a 422, not a server error."""
+    response = redis_client.post("/context/big", json={"value": 2 ** 70})
+    assert response.status_code == 422
+    assert redis_client.get("/context/big").status_code == 404
+
+
+def test_context_endpoints(redis_client):
+    """Test storing, reading, waiting for and deleting context through the API."""
+    response = redis_client.post("/context/shared", json={"value": {"data": [1, 2]}})
+    assert response.json() == {"key": "shared", "success": True}
+    
+    assert redis_client.get("/context/shared").json() == {"key": "shared", "value": {"data": [1, 2]}}
+    response = redis_client.get("/context/shared/wait", params={"timeout": 1})
+    assert response.json()["value"] == {"data": [1, 2]}
+    
+    assert redis_client.delete("/context/shared").json() == {"key": "shared", "deleted": True}
+    assert redis_client.get("/context/shared").status_code == 404
+    assert redis_client.delete("/context/shared").status_code == 404
+    assert redis_client.get("/context/shared/wait", params={"timeout": 0.05}).status_code == 404
+
+
+def test_workflow_endpoint(redis_client):
+    """Test running a workflow and reading back its tasks and context."""
+    response = redis_client.post("/workflow/run", json={"steps": [
+        {"agent": "researcher", "task": "Research AI trends", "task_id": "wf_research"},
+        {"agent": "coder", "task": "Create a Python function", "task_id": "wf_code"}
+    ]})
+    
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert results[1]["result"]["used_research"] is True
+    assert redis_client.get("/tasks/wf_code").json()["status"] == "completed"
+    research = redis_client.get("/context/latest_research").json()["value"]
+    assert research["query"] == "Research AI trends"
+    assert redis_client.get("/tasks/missing").status_code == 404
+
+
+def test_app_without_orjson(fake_redis, monkeypatch):
+    """Test that responses fall back to the stdlib JSON encoder without orjson."""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("main_without_orjson", main.__file__)
+    fallback = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fallback)
+    
+    assert fallback.DefaultResponse is JSONResponse
+    response = TestClient(fallback.app).get("/agents/researcher/status")
+    assert response.status_code == 200
+    assert response.json()["agent"] == "Researcher"
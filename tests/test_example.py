@@ -0,0 +1,8 @@
+import inspect
+import example
+
+
+def test_example_imports():
+    """Test that the example script imports and exposes its entry point."""
+    assert inspect.iscoroutinefunction(example.main)
+    assert example.BASE_URL.startswith("http")
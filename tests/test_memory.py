@@ -1,122 +1,526 @@
+import importlib.util
+import sys
+import threading
 import pytest
+import redis
 from unittest.mock import Mock, patch
+import memory as memory_module
 from memory import RedisMemory
+from tests.conftest import packed
 
 
 @pytest.fixture
 def mock_redis_client():
-    """Create a mock Redis client."""
+    """Create a mock Redis client for error paths fakeredis cannot produce."""
     client = Mock()
     client.ping.return_value = True
     client.set.return_value = True
-    client.setex.return_value = True
-    client.get.return_value = '{"test": "data"}'
-    client.delete.return_value = 1
-    client.exists.return_value = 1
-    client.rpush.return_value = 1
-    client.lrange.return_value = ['{"item": 1}', '{"item": 2}']
-    client.flushdb.return_value = True
     return client
 
 
-@patch('memory.redis.Redis')
-def test_redis_memory_init(mock_redis_class, mock_redis_client):
+def test_redis_memory_init(fake_redis):
     """Test RedisMemory initialization."""
-    mock_redis_class.return_value = mock_redis_client
-    
     memory = RedisMemory(host="localhost", port=6379)
     
     assert memory.host == "localhost"
     assert memory.port == 6379
-    assert memory.client is not None
-    mock_redis_client.ping.assert_called_once()
+    assert memory.client.ping() is True
 
 
-@patch('memory.redis.Redis')
-def test_redis_memory_set(mock_redis_class, mock_redis_client):
+def test_redis_memory_set(fake_redis):
     """Test setting a value in Redis."""
-    mock_redis_class.return_value = mock_redis_client
-    
     memory = RedisMemory()
     result = memory.set("test_key", {"data": "value"})
     
     assert result is True
-    mock_redis_client.set.assert_called_once()
+    assert fake_redis.get("test_key") == packed({"data": "value"})
+    assert fake_redis.ttl("test_key") == -1
 
 
-@patch('memory.redis.Redis')
-def test_redis_memory_get(mock_redis_class, mock_redis_client):
+def test_redis_memory_set_with_ttl(fake_redis):
+    """Test setting a value with TTL."""
+    memory = RedisMemory()
+    result = memory.set("test_key", {"data": "value"}, ttl=60)
+    
+    assert result is True
+    assert 0 < fake_redis.ttl("test_key") <= 60
+
+
+def test_redis_memory_pipeline_set(fake_redis):
+    """Test setting several values in one pipeline round trip."""
+    memory = RedisMemory()
+    result = memory.pipeline_set({"key1": "value1", "key2": {"data": "value"}}, ttl=30)
+    
+    assert result is True
+    assert fake_redis.mget(["key1", "key2"]) == [packed("value1"), packed({"data": "value"})]
+    assert 0 < fake_redis.ttl("key2") <= 30
+
+
+def test_redis_memory_pipeline(fake_redis):
+    """Test queuing mixed commands and decoding their results."""
+    fake_redis.set("key2", packed({"test": "data"}))
+    
+    memory = RedisMemory()
+    with memory.pipeline() as batch:
+        batch.set("key1", {"data": "value"}, ttl=60).get("key2").get("missing").delete("key2")
+        result = batch.execute()
+    
+    assert result == [True, {"test": "data"}, None, 1]
+    assert 0 < fake_redis.ttl("key1") <= 60
+    assert memory.get("key1") == {"data": "value"}
+    assert memory.get("key2") is None
+
+
+def test_redis_memory_set_async(fake_redis):
+    """Test that queued writes are flushed by the background writer."""
+    memory = RedisMemory()
+    memory.set_async("test_key", {"data": "value"})
+    memory.set_async("ttl_key", "value", ttl=30)
+    memory.flush()
+    
+    assert fake_redis.get("test_key") == packed({"data": "value"})
+    assert 0 < fake_redis.ttl("ttl_key") <= 30
+
+
+def test_redis_memory_get(fake_redis):
     """Test getting a value from Redis."""
-    mock_redis_class.return_value = mock_redis_client
+    fake_redis.set("test_key", packed({"test": "data"}))
     
     memory = RedisMemory()
-    result = memory.get("test_key")
     
-    assert result == {"test": "data"}
-    mock_redis_client.get.assert_called_once_with("test_key")
+    assert memory.get("test_key") == {"test": "data"}
+    assert memory.get("missing_key") is None
 
 
-@patch('memory.redis.Redis')
-def test_redis_memory_delete(mock_redis_class, mock_redis_client):
-    """Test deleting a key from Redis."""
-    mock_redis_class.return_value = mock_redis_client
+def test_redis_memory_local_cache(fake_redis):
+    """Test that values written by this process are read back without Redis."""
+    memory = RedisMemory()
+    memory.set("test_key", {"data": "value"})
+    fake_redis.set("test_key", packed({"data": "elsewhere"}))
+    
+    assert memory.get("test_key") == {"data": "value"}
     
+    memory.delete("test_key")
+    assert memory.get("test_key") is None
+
+
+def test_redis_memory_local_cache_bypass(fake_redis):
+    """Test that local_cache=False reads through to Redis."""
     memory = RedisMemory()
-    result = memory.delete("test_key")
+    memory.set("test_key", {"data": "value"})
+    fake_redis.set("test_key", packed({"data": "elsewhere"}))
     
-    assert result is True
-    mock_redis_client.delete.assert_called_once_with("test_key")
+    assert memory.get("test_key", local_cache=False) == {"data": "elsewhere"}
+    assert memory.get("test_key") == {"data": "elsewhere"}
+
+
+def test_redis_memory_local_cache_read_race(fake_redis):
+    """Test that a read racing a local write does not cache the older value."""
+    fake_redis.set("test_key", packed({"data": "old"}))
+    memory = RedisMemory()
+    raw_get = memory._raw_get
+    
+    def write_during_read(key):
+        value = raw_get(key)
+        memory.set(key, {"data": "new"})
+        return value
+    memory._raw_get = write_during_read
+    
+    assert memory.get("test_key") == {"data": "old"}
+    assert memory.get("test_key") == {"data": "new"}
+
 
+def test_redis_memory_local_cache_disabled(fake_redis):
+    """Test that a zero cache size always reads from Redis."""
+    memory = RedisMemory(cache_size=0)
+    memory.set("test_key", {"data": "value"})
+    fake_redis.set("test_key", packed({"data": "elsewhere"}))
+    
+    assert memory.get("test_key") == {"data": "elsewhere"}
+
+
+def test_redis_memory_tracking_invalidation(fake_redis, monkeypatch):
+    """Test that invalidation messages drop namespaced local cache entries."""
+    memory = RedisMemory(namespace="agents")
+    memory.set("key1", "one")
+    memory.set("key2", "two")
+    
+    # Reports arriving right after this process's own write are of that write
+    memory._apply_invalidation([b"agents:key1"])
+    assert memory._cache_get("key1") == packed("one")
+    
+    monkeypatch.setattr(memory_module, "TRACKING_OWN_WRITE_WINDOW", 0)
+    fake_redis.set("agents:key1", packed("changed"))
+    memory._apply_invalidation([b"agents:key1"])
+    
+    assert memory.get("key1") == "changed"
+    assert memory._cache_get("key2") == packed("two")
+    memory._apply_invalidation(None)
+    assert memory._cache_get("key2") is None
 
+
+@patch('memory.redis.Connection')
 @patch('memory.redis.Redis')
-def test_redis_memory_exists(mock_redis_class, mock_redis_client):
-    """Test checking if a key exists."""
+def test_redis_memory_tracking_setup(mock_redis_class, mock_connection_class,
+                                      mock_redis_client, monkeypatch):
+    """Test that REDIS_CLIENT_TRACKING=1 redirects BCAST tracking to a listener."""
     mock_redis_class.return_value = mock_redis_client
+    listener, tracker = Mock(), Mock()
+    listener.read_response.side_effect = [7, [b"subscribe", b"__redis__:invalidate", 1]]
+    mock_connection_class.side_effect = [listener, tracker]
+    monkeypatch.setenv("REDIS_CLIENT_TRACKING", "1")
+    
+    with patch('memory.threading.Thread') as mock_thread:
+        RedisMemory(namespace="agents")
+    
+    listener.send_command.assert_any_call("SUBSCRIBE", memory_module.INVALIDATE_CHANNEL)
+    tracker.send_command.assert_called_once_with(
+        "CLIENT", "TRACKING", "ON", "REDIRECT", 7, "BCAST", "PREFIX", b"agents:"
+    )
+    mock_thread.return_value.start.assert_called_once()
+
+
+@patch('memory.redis.Connection')
+def test_redis_memory_tracking_requires_namespace(mock_connection_class, fake_redis, monkeypatch):
+    """Test that tracking is not enabled without a namespace to use as PREFIX."""
+    monkeypatch.setenv("REDIS_CLIENT_TRACKING", "1")
+    
+    RedisMemory()
+    
+    mock_connection_class.assert_not_called()
+
+
+@patch('memory.redis.Connection')
+def test_redis_memory_tracking_unsupported(mock_connection_class, fake_redis, monkeypatch):
+    """Test that servers without client tracking fall back to the plain local cache."""
+    mock_connection_class.return_value.read_response.side_effect = redis.ResponseError("unknown command")
+    monkeypatch.setenv("REDIS_CLIENT_TRACKING", "1")
+    
+    memory = RedisMemory(namespace="agents")
+    memory.set("key1", "one")
+    fake_redis.set("agents:key1", packed("elsewhere"))
+    
+    assert memory.get("key1") == "one"
+
+
+def test_redis_memory_msgpack_round_trip(fake_redis):
+    """Test that values are stored as prefixed msgpack and read back."""
+    memory = RedisMemory(cache_size=0)
+    memory.set("test_key", {"data": [1, 2], 3: b"raw"})
+    
+    assert fake_redis.get("test_key") == packed({"data": [1, 2], 3: b"raw"})
+    assert memory.get("test_key") == {"data": [1, 2], 3: b"raw"}
+
+
+def test_small_string_encoding_reused():
+    """Test that short strings are encoded once and long ones every time."""
+    encode = memory_module.SERIALIZERS["msgpack"]
+    long_value = "x" * (memory_module.SMALL_STR_MAX_LEN + 1)
+    
+    assert encode("completed") == packed("completed")
+    assert encode("completed") is encode("completed")
+    assert encode(long_value) == packed(long_value)
+    assert encode(long_value) is not encode(long_value)
+
+
+def test_redis_memory_json_serializer(fake_redis):
+    """Test that the JSON serializer writes plain JSON."""
+    memory = RedisMemory(serializer="json", cache_size=0)
+    memory.set("test_key", {"data": "value"})
+    
+    assert fake_redis.get("test_key") == b'{"data":"value"}'
+    assert memory.get("test_key") == {"data": "value"}
+
+
+def test_registered_constant_encoding():
+    """Test that registered constants reuse their pre-encoded bytes."""
+    running = memory_module.register_constant(("status", "running " * 8))
+    
+    for name, encode in memory_module.SERIALIZERS.items():
+        assert encode(running) is memory_module._PINNED[name][id(running)]
+    assert memory_module.SERIALIZERS["msgpack"](running) == packed(list(running))
+    # An equal but distinct object is encoded normally
+    copy = tuple(["status", "running " * 8])
+    assert memory_module.SERIALIZERS["msgpack"](copy) == packed(list(copy))
+    assert memory_module.SERIALIZERS["msgpack"](copy) is not memory_module.SERIALIZERS["msgpack"](copy)
+    
+    for mutable in ({"status": "running"}, ["running"], ("status", ["running"])):
+        with pytest.raises(TypeError, match="immutable"):
+            memory_module.register_constant(mutable)
+
+
+def test_json_fallback_without_orjson(monkeypatch):
+    """Test that the stdlib JSON fallback matches orjson's output."""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("memory_without_orjson", memory_module.__file__)
+    fallback = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fallback)
+    
+    value = {"data": ["é", 1, None], 2: True}
+    encoded = fallback.SERIALIZERS["json"](value)
+    assert encoded == memory_module.SERIALIZERS["json"](value)
+    assert fallback._decode(encoded) == {"data": ["é", 1, None], "2": True}
+
+
+def test_redis_memory_get_legacy_json(fake_redis):
+    """Test that values stored as JSON are still readable."""
+    fake_redis.set("test_key", b'{"test": "data"}')
     
     memory = RedisMemory()
-    result = memory.exists("test_key")
     
-    assert result is True
-    mock_redis_client.exists.assert_called_once_with("test_key")
+    assert memory.get("test_key") == {"test": "data"}
 
 
-@patch('memory.redis.Redis')
-def test_redis_memory_list_operations(mock_redis_class, mock_redis_client):
-    """Test list operations in Redis."""
-    mock_redis_class.return_value = mock_redis_client
+def test_redis_memory_namespace(fake_redis):
+    """Test that a namespace prefixes every key sent to Redis."""
+    memory = RedisMemory(namespace="agents", cache_size=0)
+    memory.set("test_key", "value")
+    memory.append_many("test_list", [1])
+    memory.set_async("status", "done")
+    memory.set(b"raw_key", "bytes")
+    memory.flush()
+    
+    assert sorted(fake_redis.keys()) == [
+        b"agents:raw_key", b"agents:status", b"agents:test_key", b"agents:test_list"
+    ]
+    assert memory.get(b"raw_key") == "bytes"
+    assert memory.get_many(["test_key", "status"]) == ["value", "done"]
+    assert memory.get_list("test_list") == [1]
+
+
+def test_redis_memory_invalid_serializer():
+    """Test that an unknown serializer is rejected."""
+    with pytest.raises(ValueError):
+        RedisMemory(serializer="pickle")
+
+
+def test_redis_memory_get_many(fake_redis):
+    """Test getting several values in one round trip."""
+    fake_redis.set("test_key", packed({"test": "data"}))
+    
+    memory = RedisMemory()
+    result = memory.get_many(["test_key", "missing_key"])
+    
+    assert result == [{"test": "data"}, None]
+
+
+def test_redis_memory_mget_mset(fake_redis):
+    """Test bulk reads and writes in one round trip each."""
+    memory = RedisMemory(cache_size=0)
+    
+    assert memory.mset({"plan": [1, 2], "state": "ready"}) is True
+    assert fake_redis.get("state") == packed("ready")
+    assert memory.mget(["plan", "state", "missing"]) == {"plan": [1, 2], "state": "ready", "missing": None}
+    
+    # MSET has no expiry, so a ttl goes through a pipeline instead
+    assert memory.mset({"plan": [3]}, ttl=60) is True
+    assert 0 < fake_redis.ttl("plan") <= 60
+    assert memory.mget(["plan"]) == {"plan": [3]}
+
+
+def test_redis_memory_delete(fake_redis):
+    """Test deleting a key from Redis."""
+    memory = RedisMemory()
+    memory.set("test_key", "value")
+    
+    assert memory.delete_one("test_key") is True
+    assert memory.delete_one("test_key") is False
+    assert fake_redis.exists("test_key") == 0
     
+    memory.mset({"key1": 1, "key2": 2})
+    assert memory.delete("key1", "key2", "missing_key") == 2
+    assert memory.get("key1") is None
+    assert memory.delete() == 0
+
+
+def test_redis_memory_exists(fake_redis):
+    """Test checking if a key exists."""
+    memory = RedisMemory()
+    memory.set("test_key", "value")
+    
+    assert memory.exists_one("test_key") is True
+    assert memory.exists_one("missing_key") is False
+    assert memory.exists("test_key", "missing_key", "test_key") == 2
+
+
+def test_redis_memory_list_operations(fake_redis):
+    """Test list operations in Redis."""
     memory = RedisMemory()
     
     # Test append_to_list
-    result = memory.append_to_list("test_list", {"item": "value"})
-    assert result == 1
-    mock_redis_client.rpush.assert_called_once()
+    assert memory.append_to_list("test_list", {"item": 1}) == 1
+    assert memory.append_to_list("test_list", {"item": 2}) == 2
     
     # Test get_list
-    result = memory.get_list("test_list")
-    assert len(result) == 2
-    assert result[0] == {"item": 1}
-    mock_redis_client.lrange.assert_called_once_with("test_list", 0, -1)
+    assert memory.get_list("test_list") == [{"item": 1}, {"item": 2}]
+    assert memory.get_list("missing_list") == []
+
+
+def test_redis_memory_get_list_mixed_formats(fake_redis):
+    """Test reading a list holding both msgpack and legacy JSON items."""
+    fake_redis.rpush("test_list", packed({"item": 1}), b'{"item": 2}')
+    
+    memory = RedisMemory()
+    
+    assert memory.get_list("test_list") == [{"item": 1}, {"item": 2}]
+
+
+def test_redis_memory_append_many(fake_redis):
+    """Test appending a batch of values with one RPUSH."""
+    memory = RedisMemory()
+    result = memory.append_many("test_list", [{"item": 1}, {"item": 2}, {"item": 3}])
+    
+    assert result == 3
+    assert memory.get_list("test_list") == [{"item": 1}, {"item": 2}, {"item": 3}]
+    assert memory.append_many("test_list", []) == 0
+
+
+def test_redis_memory_append_async(fake_redis):
+    """Test that queued appends and sets are applied in order."""
+    memory = RedisMemory()
+    memory.append_async("log", "a")
+    memory.append_async("log", "b")
+    memory.set_async("status", "done")
+    memory.append_async("log", "c")
+    memory.flush()
+    
+    assert memory.get_list("log") == ["a", "b", "c"]
+    assert fake_redis.get("status") == packed("done")
+
+
+def test_redis_memory_packed_list(fake_redis):
+    """Test appending to and reading a list stored as one array."""
+    memory = RedisMemory(cache_size=0)
+    memory.append_to_packed_list("test_list", {"item": 1})
+    result = memory.append_to_packed_list("test_list", {"item": 2})
+    
+    assert result == 2
+    assert fake_redis.get("test_list") == packed([{"item": 1}, {"item": 2}])
+    assert memory.get_packed_list("test_list") == [{"item": 1}, {"item": 2}]
+    assert memory.get_packed_list("missing_list") == []
+
+
+def test_redis_memory_packed_list_size_warning(fake_redis, monkeypatch, caplog):
+    """Test that a packed list growing past the limit is reported once."""
+    monkeypatch.setattr(memory_module, "PACKED_LIST_WARN_ITEMS", 2)
+    memory = RedisMemory()
+    
+    for item in range(4):
+        memory.append_to_packed_list("findings", item)
+    
+    warnings = [r for r in caplog.records if "Packed list findings" in r.getMessage()]
+    assert len(warnings) == 1
+    assert memory.get_packed_list("findings") == [0, 1, 2, 3]
+
+
+def test_redis_memory_wait_for(fake_redis):
+    """Test waiting for a key until its update is published."""
+    memory = RedisMemory()
+    
+    def publish_later():
+        fake_redis.publish("updates", "other_key")
+        fake_redis.set("test_key", packed({"test": "data"}))
+        fake_redis.publish("updates", "test_key")
+    timer = threading.Timer(0.05, publish_later)
+    timer.start()
+    
+    try:
+        assert memory.wait_for("test_key", "updates", timeout=2) == {"test": "data"}
+    finally:
+        timer.cancel()
+    assert memory.wait_for("missing_key", "updates", timeout=0.05) is None
+
+
+def test_redis_memory_clear_all(fake_redis, monkeypatch):
+    """Test that clearing is scoped to the namespace when one is set."""
+    monkeypatch.setattr(memory_module, "CLEAR_BATCH_SIZE", 2)
+    fake_redis.set("b:keep", "value")
+    fake_redis.set("ab:keep", "value")
+    memory = RedisMemory(namespace="a*")
+    memory.mset({"key1": "one", "key2": "two", "key3": "three"})
+    
+    assert memory.clear_all() is True
+    assert sorted(fake_redis.keys()) == [b"ab:keep", b"b:keep"]
+    assert memory.get("key1") is None
+    
+    # Without a namespace the whole database is flushed
+    memory = RedisMemory()
+    memory.set("test_key", "value")
+    assert memory.clear_all() is True
+    assert fake_redis.dbsize() == 0
+    assert memory.get("test_key") is None
 
 
 @patch('memory.redis.Redis')
-def test_redis_memory_connection_error(mock_redis_class):
-    """Test handling of connection errors."""
-    mock_client = Mock()
-    mock_client.ping.side_effect = Exception("Connection failed")
-    mock_redis_class.return_value = mock_client
+def test_redis_memory_eviction_from_env(mock_redis_class, mock_redis_client, monkeypatch):
+    """Test that the eviction policy is only set when REDIS_SET_EVICTION=1."""
+    mock_redis_class.return_value = mock_redis_client
     
-    with pytest.raises(ConnectionError):
-        RedisMemory()
+    RedisMemory(host="localhost", port=6379)
+    mock_redis_client.config_set.assert_not_called()
+    
+    memory_module._PINGED.clear()
+    monkeypatch.setenv("REDIS_SET_EVICTION", "1")
+    monkeypatch.setenv("REDIS_EVICTION_POLICY", "volatile-lru")
+    monkeypatch.setenv("REDIS_MAXMEMORY", "256mb")
+    RedisMemory(host="localhost", port=6379)
+    
+    mock_redis_client.config_set.assert_any_call("maxmemory", "256mb")
+    mock_redis_client.config_set.assert_any_call("maxmemory-policy", "volatile-lru")
 
 
 @patch('memory.redis.Redis')
-def test_redis_memory_set_with_ttl(mock_redis_class, mock_redis_client):
-    """Test setting a value with TTL."""
+def test_redis_memory_eviction_config_disabled(mock_redis_class, mock_redis_client, monkeypatch):
+    """Test that a server refusing CONFIG SET does not fail the connection."""
     mock_redis_class.return_value = mock_redis_client
+    mock_redis_client.config_set.side_effect = redis.ResponseError("unknown command 'CONFIG'")
+    monkeypatch.setenv("REDIS_SET_EVICTION", "1")
     
     memory = RedisMemory()
-    result = memory.set("test_key", {"data": "value"}, ttl=60)
     
-    assert result is True
-    mock_redis_client.setex.assert_called_once()
+    assert memory.client is mock_redis_client
+    with pytest.raises(RuntimeError):
+        memory.configure_eviction()
+
+
+@patch('memory.redis.Redis')
+def test_redis_memory_shared_pool(mock_redis_class, mock_redis_client):
+    """Test that instances share one pool per server and ping it once."""
+    mock_redis_class.return_value = mock_redis_client
+    
+    RedisMemory(host="localhost", port=6379)
+    RedisMemory(host="localhost", port=6379)
+    
+    pools = [c.kwargs["connection_pool"] for c in mock_redis_class.call_args_list]
+    assert pools[0] is pools[1]
+    mock_redis_client.ping.assert_called_once()
+
+
+@patch('memory.redis.Redis')
+def test_redis_memory_error_handling(mock_redis_class, mock_redis_client):
+    """Test that Redis errors are wrapped and other errors propagate."""
+    mock_redis_class.return_value = mock_redis_client
+    mock_redis_client.get.side_effect = redis.TimeoutError("Timed out")
+    
+    memory = RedisMemory()
+    with pytest.raises(RuntimeError, match="Failed to get key test_key: Timed out"):
+        memory.get("test_key")
+    with pytest.raises(TypeError):
+        memory.set("test_key", object())
+    
+    # Bulk writes name only the keys, never the values
+    mock_redis_client.mset.side_effect = redis.TimeoutError("Timed out")
+    with pytest.raises(RuntimeError) as excinfo:
+        memory.mset({"key1": "secret"})
+    assert str(excinfo.value) == "Failed to set keys ['key1']: Timed out"
+
+
+@patch('memory.redis.Redis')
+def test_redis_memory_connection_error(mock_redis_class):
+    """Test handling of connection errors."""
+    mock_client = Mock()
+    mock_client.ping.side_effect = redis.ConnectionError("Connection failed")
+    mock_redis_class.return_value = mock_client
+    
+    with pytest.raises(ConnectionError):
+        RedisMemory()
@@ -0,0 +1,89 @@
+import asyncio
+import fakeredis
+import pytest
+import redis
+import redis.asyncio as aioredis
+from unittest.mock import AsyncMock, patch
+import memory_async as memory_async_module
+from memory_async import AsyncRedisMemory
+from tests.conftest import packed
+
+
+@pytest.mark.asyncio
+async def test_async_memory_set_get(fake_redis):
+    """Test storing and retrieving a value."""
+    memory = AsyncRedisMemory()
+    assert await memory.set("test_key", {"test": "data"}, ttl=60) is True
+    assert await memory.get("test_key") == {"test": "data"}
+    assert await memory.get("missing_key") is None
+    
+    assert fake_redis.get("test_key") == packed({"test": "data"})
+    assert 0 < fake_redis.ttl("test_key") <= 60
+
+
+@pytest.mark.asyncio
+async def test_async_memory_bulk_and_lists(fake_redis):
+    """Test batched reads and writes and list operations."""
+    memory = AsyncRedisMemory(namespace="agents")
+    assert await memory.mset({"key1": {"test": "data"}}) is True
+    assert await memory.get_many(["key1", "key2"]) == [{"test": "data"}, None]
+    assert await memory.mget(["key1"]) == {"key1": {"test": "data"}}
+    assert await memory.append_many("test_list", [1, 2]) == 2
+    assert await memory.get_list("test_list") == [1, 2]
+    assert await memory.exists("key1", "test_list", "missing") == 2
+    assert await memory.delete("key1", "missing") == 1
+    assert await memory.delete_one("key1") is False
+    assert await memory.set(b"raw_key", "bytes") is True
+    assert await memory.get(b"raw_key") == "bytes"
+    assert await memory.delete_one(b"raw_key") is True
+    
+    assert fake_redis.keys() == [b"agents:test_list"]
+
+
+@pytest.mark.asyncio
+async def test_async_memory_set_and_publish(fake_redis):
+    """Test that a write is announced to waiting readers."""
+    memory = AsyncRedisMemory()
+    waiter = asyncio.create_task(memory.wait_for("context:key", "context-updates", timeout=2))
+    await asyncio.sleep(0.05)
+    
+    assert await memory.set_and_publish("context:key", "value", "context-updates") is True
+    assert await waiter == "value"
+    assert fake_redis.get("context:key") == packed("value")
+
+
+@pytest.mark.asyncio
+async def test_async_memory_concurrent_waits(monkeypatch):
+    """Test that more waiters than pooled connections queue instead of failing."""
+    server = fakeredis.FakeServer()
+    pool = aioredis.BlockingConnectionPool(
+        connection_class=fakeredis.FakeAsyncRedisConnection, server=server,
+        max_connections=8, timeout=1
+    )
+    monkeypatch.setattr(memory_async_module, "_get_async_pool", lambda host, port: pool)
+    monkeypatch.setattr(memory_async_module, "MAX_CONCURRENT_WAITS", 2)
+    memory = AsyncRedisMemory()
+    
+    waiters = [
+        asyncio.create_task(memory.wait_for("context:key", "context-updates", timeout=2))
+        for _ in range(20)
+    ]
+    await asyncio.sleep(0.05)
+    assert await memory.get("context:key") is None
+    await memory.set_and_publish("context:key", "value", "context-updates")
+    
+    assert await asyncio.wait_for(asyncio.gather(*waiters), 5) == ["value"] * 20
+    await pool.disconnect()
+
+
+@pytest.mark.asyncio
+@patch('memory_async.aioredis.Redis')
+async def test_async_memory_error(mock_redis_class):
+    """Test that Redis errors are wrapped like RedisMemory's."""
+    mock_async_client = AsyncMock()
+    mock_async_client.get.side_effect = redis.ConnectionError("Connection lost")
+    mock_redis_class.return_value = mock_async_client
+    
+    memory = AsyncRedisMemory()
+    with pytest.raises(RuntimeError, match="Failed to get key test_key"):
+        await memory.get("test_key")